@@ -1,76 +1,124 @@
-import os
+import base64
+import csv
+import io
 import json
-import math
-import random
-from datetime import datetime, timedelta
-
-from dotenv import load_dotenv
-from flask import Flask, request, render_template, jsonify
-from flask_migrate import Migrate
-import requests
-
-from config import Config
-from models import db, Walk
-
-load_dotenv()
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import click
+import numpy as np
+from flask import Flask, Response, request, render_template, jsonify, stream_with_context
+from flask_migrate import Migrate, stamp
+from sqlalchemy import and_, insert, inspect, or_
+
+from config import selected_config
+from geo import GEOHASH_END, encode_geohash, geohash_cells, haversine_km, radius_bbox
+from heatmap import bin_pending_walks, queue_walks, rebuild_heatmap, render_stale_tiles
+from metrics import Metrics
+from models import (GEOHASH_PRECISION, db, HeatmapTile, Walk, decode_route, encode_route,
+                    use_sqlite_pragmas)
+from prefetch import Prefetcher, top_walk_locations
+from profiling import Profiler
+from routing import (MAX_ROUTE_KM, MIN_ROUTE_KM, create_route_coordinates, generate_loop_routes,
+                     generate_routes, route_difficulty, score_routes)
+from spots import SpotService, import_spots
+from stats import PERIOD_FORMATS, rebuild_rollups, record_walks, summarize
+from synthetic import insert_synthetic_walks
+from upstream import CircuitBreaker, UpstreamClient
+from weather import WeatherService
 
 app = Flask(__name__)
-app.config.from_object(Config)
+app.config.from_object(selected_config())
 
 db.init_app(app)
 with app.app_context():
-    db.create_all()
+    use_sqlite_pragmas(db.engine, app.config['SQLITE_PRAGMAS'])
 
 migrate = Migrate(app, db)
 
-
-def get_dog_friendly_spots(lat, lon, radius=1500):
-    overpass_url = "http://overpass-api.de/api/interpreter"
-    query = f"""
-    [out:json];
-    (
-      node["leisure"="dog_park"](around:{radius},{lat},{lon});
-      node["shop"="pet"](around:{radius},{lat},{lon});
-      node["amenity"="drinking_water"](around:{radius},{lat},{lon});
-      node["amenity"="waste_basket"](around:{radius},{lat},{lon});
-    );
-    out body;
-    """
-    response = requests.post(overpass_url, data={"data": query})
-    if response.status_code != 200:
-        return []
-
-    data = response.json()
-    spots = []
-    for element in data.get("elements", []):
-        spot = {
-            "lat": element["lat"],
-            "lon": element["lon"],
-            "type": element["tags"].get("leisure") or
-                    element["tags"].get("shop") or
-                    element["tags"].get("amenity"),
-            "name": element["tags"].get("name", "Unnamed")
-        }
-        spots.append(spot)
-    return spots
-
-
-def create_route_coordinates(lat, lon, distance_km, steps=10):
-    segment_length = distance_km / steps
-    bearing = random.uniform(0, 360)
-    coords = [(lat, lon)]
-
-    for _ in range(steps):
-        bearing += random.uniform(-45, 45)
-        bearing %= 360
-
-        delta_lat = (segment_length / 111) * math.cos(math.radians(bearing))
-        delta_lon = (segment_length / (111 * math.cos(math.radians(lat)))) * math.sin(math.radians(bearing))
-
-        lat += delta_lat
-        lon += delta_lon
-        coords.append((lat, lon))
-    return coords
+metrics = Metrics.from_config(app.config)
+with app.app_context():
+    metrics.init_app(app, db.engine)
+
+profiler = Profiler.from_config(app.config)
+
+upstream = UpstreamClient.from_config(app.config)
+upstream.observer = metrics.observe_upstream
+upstream_executor = ThreadPoolExecutor(max_workers=app.config['UPSTREAM_MAX_WORKERS'])
+refresh_executor = ThreadPoolExecutor(max_workers=app.config['REFRESH_MAX_WORKERS'])
+
+breakers = {
+    name: CircuitBreaker(name, failure_threshold=app.config['BREAKER_FAILURE_THRESHOLD'],
+                         reset_timeout=app.config['BREAKER_RESET_SECONDS'])
+    for name in ('overpass', 'openweather')
+}
+
+spot_service = SpotService(upstream, source=app.config['SPOTS_SOURCE'],
+                           fetch_radius_m=app.config['SPOTS_FETCH_RADIUS_M'],
+                           ttl=app.config['SPOTS_CACHE_TTL_SECONDS'],
+                           maxsize=app.config['SPOTS_CACHE_MAX_ENTRIES'],
+                           cell_degrees=app.config['SPOTS_CACHE_CELL_DEGREES'],
+                           overpass_url=app.config['OVERPASS_URL'],
+                           breaker=breakers['overpass'],
+                           stale_ttl=app.config['SPOTS_CACHE_STALE_SECONDS'],
+                           executor=refresh_executor)
+
+weather_service = WeatherService(upstream, api_key=app.config['OPENWEATHER_API_KEY'],
+                                 ttl=app.config['WEATHER_CACHE_TTL_SECONDS'],
+                                 maxsize=app.config['WEATHER_CACHE_MAX_ENTRIES'],
+                                 cell_degrees=app.config['WEATHER_CACHE_CELL_DEGREES'],
+                                 url=app.config['OPENWEATHER_URL'],
+                                 breaker=breakers['openweather'],
+                                 stale_ttl=app.config['WEATHER_CACHE_STALE_SECONDS'],
+                                 executor=refresh_executor)
+
+
+def prefetch_locations():
+    if app.config['PREFETCH_LOCATIONS']:
+        return app.config['PREFETCH_LOCATIONS']
+    with app.app_context():
+        return top_walk_locations(app.config['PREFETCH_TOP_LOCATIONS'],
+                                  app.config['PREFETCH_HISTORY_DAYS'],
+                                  app.config['PREFETCH_GEOHASH_PRECISION'])
+
+
+prefetcher = Prefetcher([weather_service, spot_service], prefetch_locations,
+                        interval=app.config['PREFETCH_INTERVAL_SECONDS'],
+                        margin=app.config['PREFETCH_REFRESH_MARGIN_SECONDS'],
+                        max_rate=app.config['PREFETCH_MAX_REQUESTS_PER_SECOND'])
+
+
+@app.before_request
+def start_prefetcher():
+    # Started by the first request a process serves rather than on import, so
+    # CLI commands and other importers never spawn the thread
+    if app.config['PREFETCH_ENABLED'] and not prefetcher.running:
+        prefetcher.start()
+
+
+def get_dog_friendly_spots(lat, lon, radius=None):
+    # Called from the upstream pool, outside the request context
+    with app.app_context():
+        spots = spot_service.nearby(lat, lon, radius or app.config['ROUTE_SPOTS_RADIUS_M'],
+                                    app.config['ROUTE_SPOTS_CATEGORIES'])
+    return [spot.as_json() for spot in spots]
+
+
+ROUTE_GENERATORS = {
+    'open': generate_routes,
+    'loop': generate_loop_routes
+}
+
+
+def result_before(future, deadline, default):
+    # Wait for an upstream call until the shared deadline, falling back to
+    # default on timeout or error so one slow upstream can't block the other.
+    try:
+        return future.result(timeout=max(0, deadline - time.monotonic())), True
+    except Exception:
+        future.cancel()
+        return default, False
 
 
 @app.route('/')
@@ -79,6 +127,7 @@ def index():
 
 
 @app.route('/generate-route', methods=['POST'])
+@profiler.profile
 def generate_route():
     try:
         data = request.json
@@ -93,76 +142,107 @@ def generate_route():
         except (ValueError, TypeError):
             return jsonify({'error': 'Invalid parameter types'}), 400
 
+        route_type = data.get('route_type', 'open')
+        if route_type not in ROUTE_GENERATORS:
+            return jsonify({'error': 'route_type must be one of: ' + ', '.join(ROUTE_GENERATORS)}), 400
+
         if not (-90 <= lat <= 90) or not (-180 <= lon <= 180):
             return jsonify({'error': 'Invalid coordinates'}), 400
 
-        if not (0.5 <= distance <= 10):
-            return jsonify({'error': 'Distance must be between 0.5 and 10 km'}), 400
+        if not (MIN_ROUTE_KM <= distance <= MAX_ROUTE_KM):
+            return jsonify({'error': f'Distance must be between {MIN_ROUTE_KM} and {MAX_ROUTE_KM} km'}), 400
 
         duration_seconds = int(duration * 60)
 
-        routes = []
-        for i in range(3):
-            variation_factor = 0.9 + 0.1 * i
-            varied_route = create_route_coordinates(lat, lon, distance * variation_factor)
-            if varied_route:
-                routes.append(varied_route)
-
-        if not routes:
-            return jsonify({"error": "Failed to generate any routes."}), 500
-
-        # Weather
-        api_key = os.getenv("OPENWEATHER_API_KEY")
-        weather_url = f"https://api.openweathermap.org/data/2.5/weather?lat={lat}&lon={lon}&appid={api_key}&units=metric"
-        try:
-            weather_resp = requests.get(weather_url)
-            weather_resp.raise_for_status()
-            weather_json = weather_resp.json()
-            temperature = weather_json['main']['temp']
-            condition = weather_json['weather'][0]['main']
-            description = weather_json['weather'][0]['description']
-        except Exception:
-            temperature = condition = description = None
-
-        # Dog spots
-        spots = get_dog_friendly_spots(lat, lon)
+        # Fan out to OpenWeather and Overpass while the routes are generated
+        started = time.monotonic()
+        weather_future = upstream_executor.submit(weather_service.current, lat, lon)
+        spots_future = upstream_executor.submit(get_dog_friendly_spots, lat, lon)
+
+        variation_factors = np.linspace(0.9, 1.1, app.config['ROUTE_CANDIDATES'])
+        with metrics.span('routes'):
+            candidates = ROUTE_GENERATORS[route_type](lat, lon, distance * variation_factors,
+                                                      steps=app.config['ROUTE_STEPS'])
+
+        unavailable = []
+        with metrics.span('weather'):
+            weather, ok = result_before(
+                weather_future, started + app.config['WEATHER_DEADLINE_SECONDS'], {})
+        if not ok:
+            unavailable.append("weather")
+        weather = {key: weather.get(key) for key in ('temperature', 'condition', 'description')}
+
+        with metrics.span('spots'):
+            spots, ok = result_before(
+                spots_future, started + app.config['SPOTS_DEADLINE_SECONDS'], [])
+        if not ok:
+            unavailable.append("dog_spots")
         dog_parks = [s['name'] for s in spots if s['type'] == 'dog_park']
 
-        difficulty = 'easy' if distance <= 2 else 'medium' if distance <= 4 else 'hard'
-
-        return jsonify({
-            "routes": routes,
-            "weather": {
-                "temperature": temperature,
-                "condition": condition,
-                "description": description
-            },
-            "dog_parks": dog_parks,
-            "difficulty": difficulty,
-            "duration": duration_seconds
-        })
+        # Keep the top-scoring candidates, preferring lengths closest to the request
+        with metrics.span('scoring'):
+            scores, passed = score_routes(candidates, spots, app.config['ROUTE_SPOT_WEIGHTS'],
+                                          app.config['ROUTE_SPOT_RADIUS_KM'])
+            best = np.lexsort((np.abs(variation_factors - 1), -scores))[:app.config['ROUTE_VARIANTS']]
+            routes = candidates[best].tolist()
+            route_details = [{
+                "score": float(scores[i]),
+                "spots": [spots[j] for j in passed[i]]
+            } for i in best]
+
+        difficulty = route_difficulty(distance)
+
+        with metrics.span('serialize'):
+            return jsonify({
+                "routes": routes,
+                "route_details": route_details,
+                "weather": weather,
+                "dog_parks": dog_parks,
+                "difficulty": difficulty,
+                "duration": duration_seconds,
+                "route_type": route_type,
+                "unavailable": unavailable
+            })
 
     except Exception as e:
         return jsonify({"error": "Internal server error"}), 500
 
 
+def walk_values(data):
+    # Anything SQLite can't bind would otherwise fail the whole insert
+    for field in ('condition', 'difficulty'):
+        if data.get(field) is not None and not isinstance(data[field], str):
+            raise TypeError(f'{field} must be a string')
+    if not isinstance(data.get('dog_parks_visited', []), list):
+        raise TypeError('dog_parks_visited must be a list')
+    values = dict(
+        lat=float(data['lat']),
+        lon=float(data['lon']),
+        distance=float(data['distance']),
+        duration=int(data['duration']),
+        timestamp=datetime.utcnow(),
+        temperature=float(data['temperature']) if data.get('temperature') else None,
+        condition=data.get('condition'),
+        dog_parks_visited=json.dumps(data.get('dog_parks_visited', [])),
+        difficulty=data.get('difficulty', 'medium'),
+        route=encode_route(data.get('route'))
+    )
+    if not (-90 <= values['lat'] <= 90) or not (-180 <= values['lon'] <= 180):
+        raise ValueError('Invalid coordinates')
+    values['geohash'] = encode_geohash(values['lat'], values['lon'], GEOHASH_PRECISION)
+    return values
+
+
 @app.route('/save-walk', methods=['POST'])
 def save_walk():
     data = request.json
     try:
-        walk = Walk(
-            lat=float(data['lat']),
-            lon=float(data['lon']),
-            distance=float(data['distance']),
-            duration=int(data['duration']),
-            timestamp=datetime.utcnow(),
-            temperature=float(data['temperature']) if data.get('temperature') else None,
-            condition=data.get('condition'),
-            dog_parks_visited=json.dumps(data.get('dog_parks_visited', [])),
-            difficulty=data.get('difficulty', 'medium'),
-            route=json.dumps(data.get('route')) if data.get('route') else None
-        )
+        values = walk_values(data)
+        walk = Walk(**values)
         db.session.add(walk)
+        db.session.flush()
+        record_walks([values])
+        queue_walks([walk.id])
         db.session.commit()
         return jsonify({"message": "Walk saved successfully"}), 201
     except Exception as e:
@@ -170,16 +250,96 @@ def save_walk():
         return jsonify({'error': 'Invalid or incomplete data'}), 400
 
 
-@app.route('/api/walks', methods=['GET'])
-def api_walks():
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 10, type=int)
+def bulk_walk_rows():
+    """Yield walk payloads from a JSON array body or an NDJSON stream."""
+    if request.mimetype == 'application/x-ndjson':
+        for line in request.stream:
+            if line.strip():
+                yield json.loads(line)
+    else:
+        data = request.get_json()
+        if not isinstance(data, list):
+            raise ValueError('Expected a JSON array of walks')
+        yield from data
+
+
+def bulk_walk_values(data):
+    if not isinstance(data, dict):
+        raise ValueError('Expected a walk object')
+    try:
+        values = walk_values(data)
+        if data.get('timestamp'):
+            # Offline clients sync walks after the fact, so keep their timestamps
+            values['timestamp'] = utc_naive(datetime.fromisoformat(data['timestamp']))
+    except KeyError as e:
+        raise ValueError(f"Missing field '{e.args[0]}'")
+    except (TypeError, ValueError) as e:
+        raise ValueError(f'Invalid value: {e}')
+    return values
+
+
+def utc_naive(timestamp):
+    # Walks store naive UTC, so convert timestamps that carry an offset
+    if timestamp.tzinfo is None:
+        return timestamp
+    return timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+@app.route('/api/walks/bulk', methods=['POST'])
+def bulk_save_walks():
+    batch_size = app.config['BULK_INSERT_BATCH_SIZE']
+    inserted = 0
+    errors = []
+    batch = []
+
+    def insert_rows(rows):
+        ids = db.session.execute(insert(Walk).returning(Walk.id), rows).scalars().all()
+        record_walks(rows)
+        queue_walks(ids)
+        db.session.commit()
 
+    def flush():
+        nonlocal inserted
+        try:
+            insert_rows([values for _, values in batch])
+            inserted += len(batch)
+        except Exception:
+            db.session.rollback()
+            # Retry one row at a time so only the rows at fault are reported
+            for index, values in batch:
+                try:
+                    insert_rows([values])
+                    inserted += 1
+                except Exception:
+                    db.session.rollback()
+                    errors.append({'index': index, 'error': 'Database error'})
+        batch.clear()
+
+    try:
+        for index, data in enumerate(bulk_walk_rows()):
+            try:
+                batch.append((index, bulk_walk_values(data)))
+            except ValueError as e:
+                errors.append({'index': index, 'error': str(e)})
+            if len(batch) >= batch_size:
+                flush()
+    except ValueError:
+        if batch:
+            flush()
+        return jsonify({'error': 'Malformed request body', 'inserted': inserted, 'errors': errors}), 400
+    if batch:
+        flush()
+
+    status = 201 if inserted else 400
+    return jsonify({'inserted': inserted, 'errors': errors}), status
+
+
+def filtered_walks_query(args):
     # Filters from query params
-    start_date_str = request.args.get('start_date')
-    end_date_str = request.args.get('end_date')
-    min_distance = request.args.get('min_distance', type=float)
-    max_distance = request.args.get('max_distance', type=float)
+    start_date_str = args.get('start_date')
+    end_date_str = args.get('end_date')
+    min_distance = args.get('min_distance', type=float)
+    max_distance = args.get('max_distance', type=float)
 
     query = Walk.query
 
@@ -190,16 +350,15 @@ def api_walks():
         end_date = datetime.strptime(end_date_str, "%Y-%m-%d") + timedelta(days=1)
         query = query.filter(Walk.timestamp < end_date)
 
-
     if min_distance is not None:
         query = query.filter(Walk.distance >= min_distance)
     if max_distance is not None:
         query = query.filter(Walk.distance <= max_distance)
+    return query
 
-    # Order by timestamp desc and paginate
-    walks_pagination = query.order_by(Walk.timestamp.desc()).paginate(page=page, per_page=per_page, error_out=False)
 
-    walks = [{
+def walk_to_dict(w):
+    return {
         'id': w.id,
         'lat': w.lat,
         'lon': w.lon,
@@ -210,7 +369,48 @@ def api_walks():
         'dog_parks_visited': w.dog_parks_visited,
         'difficulty': w.difficulty,
         'duration': w.duration
-    } for w in walks_pagination.items]
+    }
+
+
+def encode_cursor(walk):
+    raw = json.dumps([walk.timestamp.isoformat(), walk.id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+    timestamp, walk_id = json.loads(raw)
+    return datetime.fromisoformat(timestamp), int(walk_id)
+
+
+def after_cursor(query, cursor):
+    # Rows strictly after (timestamp, id) in "timestamp desc, id desc" order,
+    # phrased so SQLite can seek ix_walk_timestamp_id instead of scanning it
+    timestamp, walk_id = decode_cursor(cursor)
+    return query.filter(
+        Walk.timestamp <= timestamp,
+        or_(Walk.timestamp < timestamp, Walk.id < walk_id)
+    )
+
+
+@app.route('/api/walks', methods=['GET'])
+@profiler.profile
+def api_walks():
+    per_page = min(max(request.args.get('per_page', 10, type=int), 1), app.config['WALKS_MAX_PER_PAGE'])
+    try:
+        query = filtered_walks_query(request.args)
+    except ValueError:
+        return jsonify({'error': 'Dates must be YYYY-MM-DD'}), 400
+
+    if 'cursor' in request.args:
+        return api_walks_keyset(query, request.args.get('cursor'), per_page)
+
+    page = request.args.get('page', 1, type=int)
+
+    # Order by timestamp desc and paginate
+    walks_pagination = query.order_by(Walk.timestamp.desc()).paginate(page=page, per_page=per_page, error_out=False)
+
+    walks = [walk_to_dict(w) for w in walks_pagination.items]
 
     return jsonify({
         "page": page,
@@ -218,8 +418,246 @@ def api_walks():
         "total": walks_pagination.total,
         "walks": walks
     })
-    
+
+
+def api_walks_keyset(query, cursor, per_page):
+    """Cursor pagination on (timestamp, id); pass cursor= (empty) for the first page."""
+    total = query.order_by(None).count() if request.args.get('include_total', type=int) else None
+
+    if cursor:
+        try:
+            query = after_cursor(query, cursor)
+        except (ValueError, TypeError):
+            return jsonify({'error': 'Invalid cursor'}), 400
+
+    items = query.order_by(Walk.timestamp.desc(), Walk.id.desc()).limit(per_page + 1).all()
+    has_more = len(items) > per_page
+    items = items[:per_page]
+
+    response = {
+        "walks": [walk_to_dict(w) for w in items],
+        "per_page": per_page,
+        "next_cursor": encode_cursor(items[-1]) if has_more else None
+    }
+    if total is not None:
+        response["total"] = total
+    return jsonify(response)
+
+
+@app.route('/api/walks/stats', methods=['GET'])
+def walk_stats():
+    period = request.args.get('period', 'day')
+    if period not in PERIOD_FORMATS:
+        return jsonify({'error': 'period must be one of: ' + ', '.join(PERIOD_FORMATS)}), 400
+    try:
+        summary = summarize(period, request.args.get('start_date'), request.args.get('end_date'))
+    except ValueError:
+        return jsonify({'error': 'Dates must be YYYY-MM-DD'}), 400
+    return jsonify(summary)
+
+
+@app.cli.command('init-db')
+def init_db_command():
+    """Create the tables in a new database and mark it as fully migrated."""
+    if inspect(db.engine).has_table('walk'):
+        raise click.ClickException('The database already has tables; run `flask db upgrade` instead.')
+    db.create_all()
+    stamp()
+    print("Database created.")
+
+
+@app.cli.command('rebuild-walk-stats')
+def rebuild_walk_stats_command():
+    """Recompute the walk statistics rollup table from the walk history."""
+    rebuild_rollups()
+    print("Walk statistics rebuilt.")
+
+
+def walks_in_bbox(min_lat, min_lon, max_lat, max_lon):
+    # Seek ix_walk_geohash for each covering cell, then trim to the exact box
+    cells = geohash_cells(min_lat, min_lon, max_lat, max_lon, app.config['NEARBY_MAX_GEOHASH_CELLS'])
+    return Walk.query.filter(
+        or_(*[and_(Walk.geohash >= cell, Walk.geohash < cell + GEOHASH_END) for cell in cells]),
+        Walk.lat.between(min_lat, max_lat),
+        Walk.lon.between(min_lon, max_lon)
+    )
+
+
+@app.route('/api/walks/nearby', methods=['GET'])
+def nearby_walks():
+    limit = min(max(request.args.get('limit', 50, type=int), 1), app.config['NEARBY_MAX_RESULTS'])
+    lat = request.args.get('lat', type=float)
+    lon = request.args.get('lon', type=float)
+    bbox = [request.args.get(key, type=float) for key in ('min_lat', 'min_lon', 'max_lat', 'max_lon')]
+
+    if lat is not None and lon is not None:
+        radius_km = request.args.get('radius_km', 1.0, type=float)
+        if not (0 < radius_km <= app.config['NEARBY_MAX_RADIUS_KM']):
+            return jsonify({'error': f"radius_km must be between 0 and {app.config['NEARBY_MAX_RADIUS_KM']}"}), 400
+        # Rank on (id, lat, lon) alone and only load the walks that make the cut
+        rows = walks_in_bbox(*radius_bbox(lat, lon, radius_km)).with_entities(Walk.id, Walk.lat, Walk.lon).all()
+        ids, lats, lons = map(np.array, zip(*rows)) if rows else (np.empty(0, dtype=int),) * 3
+        distances = haversine_km(lat, lon, lats, lons)
+        inside = np.flatnonzero(distances <= radius_km)
+        nearest = inside[np.argsort(distances[inside], kind='stable')][:limit]
+        ids = ids[nearest].tolist()
+        walks = {w.id: w for w in Walk.query.filter(Walk.id.in_(ids))} if ids else {}
+        results = [dict(walk_to_dict(walks[walk_id]), distance_from_km=round(float(distance), 3))
+                   for walk_id, distance in zip(ids, distances[nearest])]
+    elif None not in bbox:
+        if bbox[0] > bbox[2] or bbox[1] > bbox[3]:
+            return jsonify({'error': 'Invalid bounding box'}), 400
+        walks = walks_in_bbox(*bbox).order_by(Walk.timestamp.desc()).limit(limit).all()
+        results = [walk_to_dict(w) for w in walks]
+    else:
+        return jsonify({'error': 'Provide lat and lon, or min_lat, min_lon, max_lat and max_lon'}), 400
+
+    return jsonify({"walks": results})
+
+
+@app.route('/heatmap/<int:z>/<int:x>/<int:y>.json')
+def heatmap_tile(z, x, y):
+    tile = db.session.get(HeatmapTile, (z, x, y))
+    if tile is None or tile.body is None:
+        return '', 204
+    response = Response(tile.body, mimetype='application/json')
+    response.set_etag(tile.etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = app.config['HEATMAP_TILE_MAX_AGE']
+    return response.make_conditional(request)
+
+
+@app.cli.command('build-heatmap')
+@click.option('--rebuild', is_flag=True, help='Recompute all bins from the walk history first.')
+def build_heatmap_command(rebuild):
+    """Bin newly saved walks and render stale tiles, or rebuild the whole heatmap."""
+    if rebuild:
+        rendered = rebuild_heatmap(app.config)
+    else:
+        binned = bin_pending_walks(app.config)
+        print(f"Binned {binned} new walks.")
+        rendered = render_stale_tiles(app.config)
+    print(f"Rendered {rendered} heatmap tiles.")
+
+
+@app.cli.command('import-spots')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--bbox', help='Only import spots inside min_lat,min_lon,max_lat,max_lon.')
+@click.option('--replace', is_flag=True, help='Delete previously imported spots first.')
+def import_spots_command(path, bbox, replace):
+    """Import dog-friendly spots from an .osm, .osm.pbf or Overpass JSON file."""
+    if bbox:
+        try:
+            bbox = [float(value) for value in bbox.split(',')]
+        except ValueError:
+            bbox = []
+        if len(bbox) != 4:
+            raise click.BadParameter('expected min_lat,min_lon,max_lat,max_lon', param_hint='--bbox')
+    try:
+        imported = import_spots(path, bbox=bbox, replace=replace)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    print(f"Imported {imported} spots.")
+
+
+@app.cli.command('generate-walks')
+@click.argument('count', type=int)
+@click.option('--area', 'areas', multiple=True, metavar='LAT,LON,RADIUS_KM',
+              help='Area to spread walk start points over; repeat for several areas.')
+@click.option('--start', type=click.DateTime(['%Y-%m-%d']), help='First walk day (default: a year ago).')
+@click.option('--end', type=click.DateTime(['%Y-%m-%d']), help='Day after the last walk (default: today).')
+@click.option('--seed', default=0, show_default=True, help='Random seed; the same seed gives the same walks.')
+@click.option('--batch-size', type=click.IntRange(min=1), default=10000, show_default=True)
+@click.option('--route-points', type=click.IntRange(min=2), default=11, show_default=True)
+@click.option('--replace', is_flag=True, help='Delete all existing walks first.')
+@click.option('--heatmap', is_flag=True, help='Rebuild the heatmap afterwards.')
+def generate_walks_command(count, areas, start, end, seed, batch_size, route_points, replace, heatmap):
+    """Bulk insert COUNT synthetic walks for scale testing."""
+    try:
+        areas = [tuple(float(part) for part in area.split(',')) for area in areas] or [(37.7749, -122.4194, 5.0)]
+    except ValueError:
+        areas = []
+    if not areas or any(len(area) != 3 for area in areas):
+        raise click.BadParameter('expected lat,lon,radius_km', param_hint='--area')
+    end = end.date() if end else datetime.utcnow().date()
+    start = start.date() if start else end - timedelta(days=365)
+    if start >= end:
+        raise click.BadParameter('must be before --end', param_hint='--start')
+
+    if replace:
+        Walk.query.delete()
+        db.session.commit()
+    started = time.perf_counter()
+    inserted = insert_synthetic_walks(
+        count, areas, start, end, seed=seed, batch_size=batch_size, route_points=route_points,
+        progress=lambda done: print(f"\r{done}/{count} walks", end='', flush=True))
+    print(f"\nInserted {inserted} walks in {time.perf_counter() - started:.1f}s.")
+    rebuild_rollups()
+    if heatmap:
+        rebuild_heatmap(app.config)
+    elif inserted:
+        print("Run `flask build-heatmap --rebuild` to include them in the heatmap.")
+
+
+EXPORT_COLUMNS = ['id', 'lat', 'lon', 'distance', 'timestamp', 'temperature', 'condition',
+                  'dog_parks_visited', 'difficulty', 'duration']
+
+
+@app.route('/api/walks/export', methods=['GET'])
+def export_walks():
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in ('ndjson', 'csv'):
+        return jsonify({'error': 'format must be ndjson or csv'}), 400
+    include_route = bool(request.args.get('include_route', type=int))
+
+    columns = [getattr(Walk, name) for name in EXPORT_COLUMNS]
+    if include_route:
+        columns.append(Walk.route)
+    try:
+        query = filtered_walks_query(request.args)
+    except ValueError:
+        return jsonify({'error': 'Dates must be YYYY-MM-DD'}), 400
+    rows = (query
+            .with_entities(*columns)
+            .order_by(Walk.timestamp.desc(), Walk.id.desc())
+            .yield_per(app.config['EXPORT_CHUNK_SIZE']))
+
+    def ndjson_lines(walk):
+        record = walk_to_dict(walk)
+        if include_route:
+            record['route'] = decode_route(walk.route)
+        return json.dumps(record) + '\n'
+
+    def csv_lines(walk):
+        record = walk_to_dict(walk)
+        if include_route:
+            record['route'] = json.dumps(decode_route(walk.route))
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(record.values())
+        return buffer.getvalue()
+
+    def generate():
+        chunk_size = app.config['EXPORT_CHUNK_SIZE']
+        if export_format == 'csv':
+            yield ','.join(EXPORT_COLUMNS + (['route'] if include_route else [])) + '\r\n'
+        to_lines = csv_lines if export_format == 'csv' else ndjson_lines
+        chunk = []
+        for walk in rows:
+            chunk.append(to_lines(walk))
+            if len(chunk) >= chunk_size:
+                yield ''.join(chunk)
+                chunk = []
+        if chunk:
+            yield ''.join(chunk)
+
+    mimetype = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+    return Response(stream_with_context(generate()), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename=walks.{export_format}'
+    })
+
+
 @app.route('/walks')
+@profiler.profile
 def walks_page():
     page = request.args.get('page', 1, type=int)
     per_page = 10
@@ -236,28 +674,15 @@ def dog_spots():
     lon = data.get('lon')
     if not lat or not lon:
         return jsonify({"error": "Missing coordinates"}), 400
+    try:
+        lat, lon = float(lat), float(lon)
+    except (ValueError, TypeError):
+        return jsonify({"error": "Invalid coordinates"}), 400
 
-    query = f"""
-    [out:json];
-    (
-      node["leisure"="dog_park"](around:2000,{lat},{lon});
-      node["shop"="pet"](around:2000,{lat},{lon});
-      node["amenity"="drinking_water"](around:2000,{lat},{lon});
-      node["waste"="dog_waste_bin"](around:2000,{lat},{lon});
-    );
-    out body;
-    """
     try:
-        response = requests.post("http://overpass-api.de/api/interpreter", data={"data": query})
-        response.raise_for_status()
-        elements = response.json().get("elements", [])
-        spots = [{
-            "lat": el["lat"],
-            "lon": el["lon"],
-            "type": el["tags"].get("leisure") or el["tags"].get("shop") or el["tags"].get("amenity") or el["tags"].get("waste"),
-            "name": el["tags"].get("name", "Unnamed")
-        } for el in elements]
-        return jsonify({"spots": spots})
+        spots = spot_service.nearby(lat, lon, app.config['DOG_SPOTS_RADIUS_M'],
+                                    app.config['DOG_SPOTS_CATEGORIES'])
+        return jsonify({"spots": [spot.as_json() for spot in spots]})
     except Exception as e:
         return jsonify({"error": "Failed to fetch dog-friendly spots"}), 500
 
@@ -270,17 +695,15 @@ def get_weather():
     if not lat or not lon:
         return jsonify({'error': 'Missing coordinates'}), 400
 
-    api_key = app.config.get("OPENWEATHER_API_KEY")
-    url = f"https://api.openweathermap.org/data/2.5/weather?lat={lat}&lon={lon}&appid={api_key}&units=metric"
+    try:
+        lat, lon = float(lat), float(lon)
+    except (ValueError, TypeError):
+        return jsonify({'error': 'Invalid coordinates'}), 400
 
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        weather = response.json()
-        temp = weather['main']['temp']
-        condition = weather['weather'][0]['main']
-        description = weather['weather'][0]['description']
-        icon = weather['weather'][0]['icon']
+        weather = weather_service.current(lat, lon)
+        temp = weather['temperature']
+        condition = weather['condition']
         recommendation = (
             "Good" if 10 <= temp <= 25 and condition in ['Clear', 'Clouds'] else
             "Okay" if 5 <= temp <= 30 and condition in ['Drizzle', 'Mist', 'Clouds', 'Rain'] else
@@ -289,13 +712,39 @@ def get_weather():
         return jsonify({
             "temperature": temp,
             "condition": condition,
-            "description": description,
-            "icon": icon,
+            "description": weather['description'],
+            "icon": weather['icon'],
             "recommendation": recommendation
         })
     except Exception:
         return jsonify({'error': 'Weather API request failed'}), 500
 
 
+@app.route('/api/cache-stats', methods=['GET'])
+def cache_stats():
+    return jsonify({
+        "dog_spots": dict(spot_service.cache.stats(), coalesced=spot_service.flight.coalesced),
+        "weather": dict(weather_service.cache.stats(), coalesced=weather_service.flight.coalesced),
+        "prefetch": prefetcher.stats()
+    })
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    if not metrics.enabled:
+        return jsonify({'error': 'Metrics are disabled'}), 404
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/health', methods=['GET'])
+def health():
+    upstreams = {name: breaker.status() for name, breaker in breakers.items()}
+    degraded = any(status['state'] != 'closed' for status in upstreams.values())
+    return jsonify({
+        "status": "degraded" if degraded else "ok",
+        "upstreams": upstreams
+    })
+
+
 if __name__ == '__main__':
     app.run(debug=True)
@@ -0,0 +1,104 @@
+"""Local stand-ins for OpenWeather and Overpass.
+
+Both servers answer after a configurable latency and fail a configurable
+fraction of requests with 503, so the client retry and circuit breaker
+paths show up in benchmark numbers.
+"""
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+AROUND = re.compile(r'around:(\d+),(-?[\d.]+),(-?[\d.]+)')
+SPOT_TAGS = [('leisure', 'dog_park'), ('shop', 'pet'), ('amenity', 'drinking_water'),
+             ('amenity', 'waste_basket'), ('waste', 'dog_waste_bin')]
+
+
+class FakeUpstreamHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.respond(self.weather)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        self.body = self.rfile.read(length).decode()
+        self.respond(self.overpass)
+
+    def respond(self, handler):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            fail = server.rng.random() < server.error_rate
+        if server.latency:
+            time.sleep(server.latency)
+        if fail:
+            status, payload = 503, {"error": "injected failure"}
+        else:
+            status, payload = 200, handler()
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def weather(self):
+        query = parse_qs(urlparse(self.path).query)
+        lat = float(query.get('lat', ['0'])[0])
+        return {
+            "main": {"temp": round(20 - abs(lat) / 5, 1)},
+            "weather": [{"main": "Clouds", "description": "scattered clouds", "icon": "03d"}]
+        }
+
+    def overpass(self):
+        query = parse_qs(self.body).get('data', [''])[0]
+        match = AROUND.search(query)
+        radius_m, lat, lon = (int(match[1]), float(match[2]), float(match[3])) if match else (1000, 0.0, 0.0)
+        rng = random.Random(f"{lat:.4f},{lon:.4f}")
+        spread = radius_m / 111000
+        elements = []
+        for i in range(self.server.spots):
+            key, value = SPOT_TAGS[i % len(SPOT_TAGS)]
+            elements.append({
+                "type": "node",
+                "id": rng.randrange(1, 10 ** 10),
+                "lat": lat + rng.uniform(-spread, spread),
+                "lon": lon + rng.uniform(-spread, spread),
+                "tags": {key: value, "name": f"Spot {i}"}
+            })
+        return {"elements": elements}
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeUpstream(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, latency=0.0, error_rate=0.0, spots=40, seed=0, port=0):
+        super().__init__(('127.0.0.1', port), FakeUpstreamHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.spots = spots
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
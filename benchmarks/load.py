@@ -0,0 +1,126 @@
+"""Drive the app's endpoints against local fake upstreams.
+
+    python -m benchmarks.load --concurrency 16 --requests 400 --latency-ms 80 --error-rate 0.02
+
+The app runs in-process on a threaded WSGI server with its own temporary
+SQLite database, so the numbers cover routing, caching, the database and
+the HTTP stack but not the real OpenWeather or Overpass.
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+from benchmarks.fake_upstreams import FakeUpstream
+from benchmarks.report import print_table, summarize, write_results
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+ENDPOINTS = ['weather', 'dog-spots', 'generate-route', 'save-walk', 'api-walks']
+
+
+def start_app(upstream_url, workdir):
+    # Must happen before the app (and its Config) is imported
+    os.environ['OPENWEATHER_URL'] = f"{upstream_url}/data/2.5/weather"
+    os.environ['OVERPASS_URL'] = f"{upstream_url}/api/interpreter"
+    os.environ['OPENWEATHER_API_KEY'] = 'benchmark'
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'benchmark.sqlite3')}"
+    from app import app, db
+    with app.app_context():
+        db.create_all()
+
+    server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietRequestHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def make_request(endpoint, base_url, rng, center, spread):
+    lat = center[0] + rng.uniform(-spread, spread)
+    lon = center[1] + rng.uniform(-spread, spread)
+    if endpoint == 'weather':
+        return 'POST', f"{base_url}/weather", {'lat': lat, 'lon': lon}
+    if endpoint == 'dog-spots':
+        return 'POST', f"{base_url}/dog-spots", {'lat': lat, 'lon': lon}
+    if endpoint == 'generate-route':
+        return 'POST', f"{base_url}/generate-route", {'lat': lat, 'lon': lon, 'distance': rng.uniform(1, 6)}
+    if endpoint == 'save-walk':
+        route = [[lat + i * 0.001, lon + i * 0.001] for i in range(20)]
+        return 'POST', f"{base_url}/save-walk", {
+            'lat': lat, 'lon': lon, 'distance': 2.0, 'duration': 1800, 'temperature': 18,
+            'condition': 'Clouds', 'difficulty': 'medium', 'route': route
+        }
+    return 'GET', f"{base_url}/api/walks?per_page=20&page={rng.randint(1, 5)}", None
+
+
+def run_endpoint(endpoint, base_url, args):
+    sessions = threading.local()
+    rng = random.Random(f"{args.seed}-{endpoint}")
+    calls = [make_request(endpoint, base_url, rng, args.center, args.spread) for _ in range(args.requests)]
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def call(request):
+        nonlocal errors
+        if not hasattr(sessions, 'session'):
+            sessions.session = requests.Session()
+        method, url, body = request
+        started = time.perf_counter()
+        try:
+            failed = sessions.session.request(method, url, json=body, timeout=30).status_code >= 500
+        except requests.RequestException:
+            failed = True
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            errors += failed
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(call, calls))
+    return summarize(latencies, time.perf_counter() - started, errors)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=200, help='Requests per endpoint.')
+    parser.add_argument('--endpoints', default=','.join(ENDPOINTS))
+    parser.add_argument('--latency-ms', type=float, default=50, help='Fake upstream response delay.')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of upstream calls failing with 503.')
+    parser.add_argument('--spots', type=int, default=40, help='Spots returned per Overpass query.')
+    parser.add_argument('--center', type=float, nargs=2, default=(37.7749, -122.4194), metavar=('LAT', 'LON'))
+    parser.add_argument('--spread', type=float, default=0.05, help='Degrees around the center to spread requests.')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='load-results.json')
+    args = parser.parse_args(argv)
+
+    upstream = FakeUpstream(latency=args.latency_ms / 1000, error_rate=args.error_rate,
+                            spots=args.spots, seed=args.seed).start()
+    with tempfile.TemporaryDirectory() as workdir:
+        server, base_url = start_app(upstream.url, workdir)
+        try:
+            results = {endpoint: run_endpoint(endpoint, base_url, args)
+                       for endpoint in args.endpoints.split(',')}
+        finally:
+            server.shutdown()
+            upstream.stop()
+
+    settings = {key: value for key, value in vars(args).items() if key != 'output'}
+    settings['upstream_requests'] = upstream.requests
+    write_results(args.output, 'load', settings, results)
+    print_table(results)
+    print(f"Upstream requests: {upstream.requests}. Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Microbenchmarks for route generation and route (de)serialization.
+
+    python -m benchmarks.micro --output micro-results.json
+"""
+import argparse
+import json
+import timeit
+
+import numpy as np
+
+from benchmarks.report import print_table, write_results
+from models import decode_route, encode_route
+from routing import create_route_coordinates, generate_loop_routes, generate_routes
+
+
+def measure(stmt, number, repeat):
+    timings = np.array(timeit.repeat(stmt, number=number, repeat=repeat)) / number * 1e6
+    return {
+        "calls": number * repeat,
+        "mean_us": round(float(timings.mean()), 2),
+        "min_us": round(float(timings.min()), 2)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--number', type=int, default=200, help='Calls per timing run.')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--points', type=int, default=500, help='Points in the (de)serialized route.')
+    parser.add_argument('--output', default='micro-results.json')
+    args = parser.parse_args(argv)
+
+    lat, lon = 37.7749, -122.4194
+    distances = 3.0 * np.linspace(0.9, 1.1, 48)
+    rng = np.random.default_rng(0)
+    route = np.column_stack([lat + np.cumsum(rng.normal(0, 1e-4, args.points)),
+                             lon + np.cumsum(rng.normal(0, 1e-4, args.points))]).tolist()
+    encoded = encode_route(route)
+    legacy = json.dumps(route)
+
+    cases = {
+        'create_route_coordinates': lambda: create_route_coordinates(lat, lon, 3.0),
+        'generate_routes_48': lambda: generate_routes(lat, lon, distances, rng=np.random.default_rng(0)),
+        'generate_loop_routes_48': lambda: generate_loop_routes(lat, lon, distances, rng=np.random.default_rng(0)),
+        'encode_route': lambda: encode_route(route),
+        'decode_route': lambda: decode_route(encoded),
+        'decode_route_legacy_json': lambda: decode_route(legacy)
+    }
+    results = {name: measure(stmt, args.number, args.repeat) for name, stmt in cases.items()}
+    results['encode_route']['encoded_bytes'] = len(encoded)
+
+    write_results(args.output, 'micro', vars(args), results)
+    print_table(results)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Result summaries shared by the benchmarks, and a regression diff.
+
+    python -m benchmarks.report baseline.json current.json
+"""
+import argparse
+import json
+import platform
+import sys
+from datetime import datetime
+
+import numpy as np
+
+TRACKED = ('p50_ms', 'p95_ms', 'p99_ms', 'rps', 'mean_us')
+
+
+def summarize(latencies, elapsed, errors=0):
+    latencies_ms = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99]) if len(latencies_ms) else (0, 0, 0)
+    return {
+        "requests": len(latencies_ms),
+        "errors": errors,
+        "rps": round(len(latencies_ms) / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(float(latencies_ms.mean()), 2) if len(latencies_ms) else 0.0,
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2)
+    }
+
+
+def write_results(path, kind, settings, results):
+    document = {
+        "kind": kind,
+        "created": datetime.utcnow().isoformat(timespec='seconds'),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "settings": settings,
+        "results": results
+    }
+    with open(path, 'w') as f:
+        json.dump(document, f, indent=2)
+
+
+def print_table(results):
+    columns = sorted({key for row in results.values() for key in row})
+    # Wide enough that neighbouring headers and values never run together
+    widths = [max([12, len(column) + 1] + [len(str(row.get(column, ''))) + 1 for row in results.values()])
+              for column in columns]
+    name_width = max([28] + [len(name) + 1 for name in results])
+    print(' ' * name_width + ''.join(f"{column:>{width}}" for column, width in zip(columns, widths)))
+    for name, row in results.items():
+        print(f"{name:{name_width}}" + ''.join(f"{row.get(column, ''):>{width}}"
+                                               for column, width in zip(columns, widths)))
+
+
+def compare(baseline, current, threshold):
+    """Return (name, metric, old, new, change) rows that moved past threshold."""
+    regressions = []
+    for name, row in current['results'].items():
+        old_row = baseline['results'].get(name, {})
+        for metric in TRACKED:
+            old, new = old_row.get(metric), row.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            # Higher is better only for throughput
+            worse = -change if metric == 'rps' else change
+            if worse > threshold:
+                regressions.append((name, metric, old, new, change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    parser.add_argument('--threshold', type=float, default=0.1, help='Allowed relative slowdown.')
+    args = parser.parse_args(argv)
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    regressions = compare(baseline, current, args.threshold)
+    for name, metric, old, new, change in regressions:
+        print(f"{name} {metric}: {old} -> {new} ({change:+.0%})")
+    if not regressions:
+        print("No regressions.")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
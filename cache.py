@@ -0,0 +1,169 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+def grid_cell(lat, lon, cell_degrees):
+    """Snap a coordinate to the (row, col) index of its grid cell."""
+    return (math.floor(lat / cell_degrees), math.floor(lon / cell_degrees))
+
+
+def cell_center(cell, cell_degrees):
+    row, col = cell
+    return ((row + 0.5) * cell_degrees, (col + 0.5) * cell_degrees)
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after a fixed TTL.
+
+    Expired entries are kept for a further stale_ttl seconds so callers can
+    serve them while a refresh happens (see lookup).
+    """
+
+    def __init__(self, ttl, maxsize, stale_ttl=0, clock=time.monotonic):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.stale_ttl = stale_ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def lookup(self, key):
+        """Return (value, fresh), or (None, False) when there is no usable entry."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None, False
+            value, expires_at = entry
+            now = self.clock()
+            if now >= expires_at + self.stale_ttl:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None, False
+            self._entries.move_to_end(key)
+            if now < expires_at:
+                self.hits += 1
+                return value, True
+            self.stale_hits += 1
+            return value, False
+
+    def get(self, key, default=None):
+        value, fresh = self.lookup(key)
+        return value if fresh else default
+
+    def fresh_for(self, key):
+        """Seconds until key expires, or 0 if it is missing or already stale."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return 0
+            return max(0, entry[1] - self.clock())
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, self.clock() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.stale_hits = self.misses = self.evictions = self.expirations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "stale_ttl_seconds": self.stale_ttl,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into one execution.
+
+    The first caller for a key runs the function; callers arriving while it
+    is still in flight wait for and receive the same result (or exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.coalesced = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            return call.result()
+        return self._run(key, call, fn, args, kwargs)
+
+    def start(self, executor, key, fn, *args, **kwargs):
+        """Run fn on executor unless a call for key is already in flight.
+
+        Returns True when a new background call was started.
+        """
+        with self._lock:
+            if key in self._calls:
+                return False
+            call = self._calls[key] = Future()
+        executor.submit(self._run, key, call, fn, args, kwargs)
+        return True
+
+    def _run(self, key, call, fn, args, kwargs):
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.set_exception(e)
+            raise
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def reset(self):
+        with self._lock:
+            self.coalesced = 0
+
+
+def stale_while_revalidate(cache, flight, key, refresh, executor=None):
+    """Read key from cache, refreshing it through flight when needed.
+
+    Fresh entries are returned as is. Stale entries are returned at once
+    while a single background refresh runs on executor. Misses wait for a
+    (coalesced) refresh.
+    """
+    value, fresh = cache.lookup(key)
+    if fresh:
+        return value
+    if value is not None and executor is not None:
+        flight.start(executor, key, refresh, key)
+        return value
+    return flight.do(key, refresh, key)
@@ -1,9 +1,158 @@
 import os
 
+from dotenv import load_dotenv
+
+load_dotenv()
 
 basedir = os.path.abspath(os.path.dirname(__file__))
 class Config:
-    SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(basedir, 'instance', 'dog_walks.sqlite3')}"
+    SQLALCHEMY_DATABASE_URI = os.getenv(
+        "DATABASE_URL", f"sqlite:///{os.path.join(basedir, 'instance', 'dog_walks.sqlite3')}")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # PRAGMA name -> value, set on every new SQLite connection
+    SQLITE_PRAGMAS = {}
     ORS_API_KEY = os.getenv("ORS_API_KEY")
     OPENWEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY")
+    OPENWEATHER_URL = os.getenv("OPENWEATHER_URL", "https://api.openweathermap.org/data/2.5/weather")
+    OVERPASS_URL = os.getenv("OVERPASS_URL", "http://overpass-api.de/api/interpreter")
+
+    # Pooled HTTP session shared by all upstream API calls
+    UPSTREAM_CONNECT_TIMEOUT = 3.05
+    UPSTREAM_READ_TIMEOUT = 8.0
+    UPSTREAM_RETRIES = 2
+    UPSTREAM_BACKOFF_FACTOR = 0.3
+    UPSTREAM_POOL_SIZE = 16
+
+    # Upstream fan-out for /generate-route
+    UPSTREAM_MAX_WORKERS = 8
+    WEATHER_DEADLINE_SECONDS = 3.0
+    SPOTS_DEADLINE_SECONDS = 5.0
+
+    # Each upstream gets a circuit breaker that opens after
+    # BREAKER_FAILURE_THRESHOLD consecutive failures and lets one trial call
+    # through every BREAKER_RESET_SECONDS. Expired cache entries are served
+    # for up to *_CACHE_STALE_SECONDS while one background refresh runs on a
+    # pool of REFRESH_MAX_WORKERS threads.
+    BREAKER_FAILURE_THRESHOLD = 5
+    BREAKER_RESET_SECONDS = 30
+    REFRESH_MAX_WORKERS = 2
+
+    # Where spot lookups come from: "overpass" (live API) or "local" (the
+    # spot table filled by `flask import-spots`)
+    SPOTS_SOURCE = os.getenv("SPOTS_SOURCE", "overpass")
+
+    # Overpass is queried once per grid cell of SPOTS_CACHE_CELL_DEGREES for
+    # every category within SPOTS_FETCH_RADIUS_M; each endpoint then filters
+    # the cached spots to its own radius and categories
+    SPOTS_FETCH_RADIUS_M = 2000
+    ROUTE_SPOTS_RADIUS_M = 1500
+    ROUTE_SPOTS_CATEGORIES = ['dog_park', 'pet', 'drinking_water', 'waste_basket']
+    DOG_SPOTS_RADIUS_M = 2000
+    DOG_SPOTS_CATEGORIES = ['dog_park', 'pet', 'drinking_water', 'dog_waste_bin']
+    SPOTS_CACHE_TTL_SECONDS = 15 * 60
+    SPOTS_CACHE_MAX_ENTRIES = 1024
+    SPOTS_CACHE_CELL_DEGREES = 0.005
+    SPOTS_CACHE_STALE_SECONDS = 24 * 60 * 60
+
+    # Weather is cached per coarse location bucket (~2 km) for 10 minutes
+    WEATHER_CACHE_TTL_SECONDS = 10 * 60
+    WEATHER_CACHE_MAX_ENTRIES = 512
+    WEATHER_CACHE_CELL_DEGREES = 0.02
+    WEATHER_CACHE_STALE_SECONDS = 60 * 60
+
+    # Prometheus metrics at /metrics; SERVER_TIMING_ENABLED also returns each
+    # request's stage, query and total times in a Server-Timing header
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "false").lower() == "true"
+    SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "false").lower() == "true"
+    METRICS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    # Opt-in cProfile capture for /generate-route, /api/walks and /walks. A
+    # request is profiled when it sends PROFILE_HEADER set to
+    # PROFILE_HEADER_TOKEN, or at random with PROFILE_SAMPLE_RATE. Profiles
+    # are pstats files in PROFILE_DIR, pruned oldest first past
+    # PROFILE_DIR_MAX_BYTES.
+    PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+    PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+    PROFILE_HEADER = 'X-Profile'
+    PROFILE_HEADER_TOKEN = os.getenv("PROFILE_HEADER_TOKEN")
+    PROFILE_DIR = os.path.join(basedir, 'instance', 'profiles')
+    PROFILE_DIR_MAX_BYTES = 50 * 1024 * 1024
+
+    # Background cache warm-up. Weather and spots are prefetched every
+    # PREFETCH_INTERVAL_SECONDS for PREFETCH_LOCATIONS ([(lat, lon), ...]) or,
+    # when that is empty, for the PREFETCH_TOP_LOCATIONS busiest walk areas
+    # of the last PREFETCH_HISTORY_DAYS. Cells still fresh for
+    # PREFETCH_REFRESH_MARGIN_SECONDS are skipped. Each serving process
+    # starts its own prefetcher on its first request (CLI commands never do),
+    # so PREFETCH_MAX_REQUESTS_PER_SECOND is a per-process limit.
+    PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "false").lower() == "true"
+    PREFETCH_LOCATIONS = []
+    PREFETCH_TOP_LOCATIONS = 20
+    PREFETCH_HISTORY_DAYS = 30
+    PREFETCH_GEOHASH_PRECISION = 5
+    PREFETCH_INTERVAL_SECONDS = 60
+    PREFETCH_REFRESH_MARGIN_SECONDS = 120
+    PREFETCH_MAX_REQUESTS_PER_SECOND = 1.0
+
+    # /generate-route scores ROUTE_CANDIDATES routes and returns the best
+    # ROUTE_VARIANTS, rewarding spots passed within ROUTE_SPOT_RADIUS_KM
+    ROUTE_CANDIDATES = 48
+    ROUTE_VARIANTS = 3
+    ROUTE_STEPS = 10
+    ROUTE_SPOT_RADIUS_KM = 0.1
+    ROUTE_SPOT_WEIGHTS = {
+        "dog_park": 3.0,
+        "drinking_water": 2.0,
+        "waste_basket": 1.0,
+        "dog_waste_bin": 1.0,
+        "pet": 0.5
+    }
+
+    # Largest page /api/walks returns; per_page is clamped to 1..this
+    WALKS_MAX_PER_PAGE = 100
+
+    # Rows fetched per round trip when streaming /api/walks/export, and
+    # rows inserted per transaction by /api/walks/bulk
+    EXPORT_CHUNK_SIZE = 1000
+    BULK_INSERT_BATCH_SIZE = 500
+
+    # /api/walks/nearby limits
+    NEARBY_MAX_RADIUS_KM = 25
+    NEARBY_MAX_RESULTS = 500
+    NEARBY_MAX_GEOHASH_CELLS = 16
+
+    # Walk heatmap tiles: HEATMAP_BINS x HEATMAP_BINS cells per z/x/y tile.
+    # Saved walks are only queued; `flask build-heatmap` (run on a schedule)
+    # bins them and renders the tiles
+    HEATMAP_ZOOMS = range(10, 17)
+    HEATMAP_BINS = 64
+    HEATMAP_SAMPLE_KM = 0.025
+    HEATMAP_TILE_MAX_AGE = 300
+
+
+class ProductionConfig(Config):
+    # WAL lets readers keep going while one writer commits, and writers
+    # wait up to busy_timeout ms for each other instead of failing with
+    # "database is locked". synchronous=NORMAL is durable under WAL except
+    # for the last transactions on power loss.
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -64 * 1024,  # KiB
+        'temp_store': 'MEMORY'
+    }
+    # One pool per worker process; size it to the worker's thread count
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.getenv("DB_POOL_SIZE", "8")),
+        'max_overflow': int(os.getenv("DB_MAX_OVERFLOW", "8")),
+        'pool_timeout': 10,
+        'pool_recycle': 3600,
+        'connect_args': {'timeout': 5, 'check_same_thread': False}
+    }
+
+
+def selected_config():
+    """The config class named by APP_CONFIG: "production" or "development" (default)."""
+    return {'production': ProductionConfig}.get(os.getenv("APP_CONFIG", "development"), Config)
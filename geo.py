@@ -0,0 +1,98 @@
+import math
+
+import numpy as np
+
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+# Sorts after every geohash character, so prefix <= hash < prefix + END covers a cell
+GEOHASH_END = '{'
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.0
+
+
+def encode_geohash(lat, lon, precision=9):
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        interval, value = (lon_range, lon) if even else (lat_range, lat)
+        mid = (interval[0] + interval[1]) / 2
+        bits <<= 1
+        if value >= mid:
+            bits |= 1
+            interval[0] = mid
+        else:
+            interval[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(GEOHASH_ALPHABET[bits])
+            bits = bit_count = 0
+    return ''.join(chars)
+
+
+def encode_geohashes(lats, lons, precision=9):
+    """Vectorized encode_geohash for arrays of coordinates; returns a list of str."""
+    bits = precision * 5
+    lon_bits, lat_bits = (bits + 1) // 2, bits // 2
+    lon_q = np.clip(((np.asarray(lons) + 180) / 360 * (1 << lon_bits)).astype(np.int64), 0, (1 << lon_bits) - 1)
+    lat_q = np.clip(((np.asarray(lats) + 90) / 180 * (1 << lat_bits)).astype(np.int64), 0, (1 << lat_bits) - 1)
+
+    # Interleave the bits, longitude first, like the bisection in encode_geohash
+    code = np.zeros(lon_q.shape, dtype=np.int64)
+    for i in range(bits):
+        if i % 2 == 0:
+            bit = (lon_q >> (lon_bits - 1 - i // 2)) & 1
+        else:
+            bit = (lat_q >> (lat_bits - 1 - i // 2)) & 1
+        code = (code << 1) | bit
+
+    shifts = 5 * np.arange(precision - 1, -1, -1)
+    alphabet = np.frombuffer(GEOHASH_ALPHABET.encode(), dtype='S1')
+    chars = np.ascontiguousarray(alphabet[(code[:, None] >> shifts) & 31])
+    return chars.view(f'S{precision}').ravel().astype(f'U{precision}').tolist()
+
+
+def geohash_cell_size(precision):
+    """Return the (lat, lon) size in degrees of a geohash cell."""
+    lon_bits = math.ceil(precision * 5 / 2)
+    lat_bits = precision * 5 // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def geohash_cells(min_lat, min_lon, max_lat, max_lon, max_cells=16, max_precision=9):
+    """Cover a bounding box with at most max_cells geohash prefixes.
+
+    Uses the finest precision whose cells still fit the budget, so the
+    prefixes hug the box as tightly as possible.
+    """
+    for precision in range(max_precision, 0, -1):
+        lat_size, lon_size = geohash_cell_size(precision)
+        rows = math.floor(max_lat / lat_size) - math.floor(min_lat / lat_size) + 1
+        cols = math.floor(max_lon / lon_size) - math.floor(min_lon / lon_size) + 1
+        if rows * cols <= max_cells:
+            break
+
+    cells = set()
+    for row in range(rows):
+        lat = min(min_lat + row * lat_size, max_lat)
+        for col in range(cols):
+            lon = min(min_lon + col * lon_size, max_lon)
+            cells.add(encode_geohash(lat, lon, precision))
+    return sorted(cells)
+
+
+def radius_bbox(lat, lon, radius_km):
+    d_lat = radius_km / KM_PER_DEGREE
+    d_lon = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(lat)), 1e-6))
+    return (max(lat - d_lat, -90.0), max(lon - d_lon, -180.0),
+            min(lat + d_lat, 90.0), min(lon + d_lon, 180.0))
+
+
+def haversine_km(lat, lon, lats, lons):
+    lat1, lon1 = np.radians(lat), np.radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
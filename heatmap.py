@@ -0,0 +1,149 @@
+import hashlib
+import json
+from collections import defaultdict
+
+import numpy as np
+from sqlalchemy import tuple_
+from sqlalchemy.dialects.sqlite import insert
+
+from models import HeatmapBin, HeatmapPending, HeatmapTile, Walk, db, decode_route, is_coordinate_list
+
+# Bin keys are (zoom, tile_x, tile_y, bin_x, bin_y)
+BIN_COLUMNS = ('zoom', 'tile_x', 'tile_y', 'bin_x', 'bin_y')
+MAX_MERCATOR_LAT = 85.05112878
+
+
+def walk_points(walk, sample_km):
+    """Points along a walk's route, resampled every sample_km, or its start point."""
+    coords = decode_route(walk['route']) if walk.get('route') else None
+    if not is_coordinate_list(coords):
+        return np.array([[walk['lat'], walk['lon']]])
+
+    coords = np.asarray(coords, dtype=float)
+    d_lat = np.diff(coords[:, 0]) * 111
+    d_lon = np.diff(coords[:, 1]) * 111 * np.cos(np.radians(coords[:-1, 0]))
+    lengths = np.hypot(d_lat, d_lon)
+    along = np.concatenate([[0], np.cumsum(lengths)])
+    samples = np.arange(0, along[-1] + sample_km / 2, sample_km) if along[-1] else np.zeros(1)
+    return np.column_stack([np.interp(samples, along, coords[:, 0]),
+                            np.interp(samples, along, coords[:, 1])])
+
+
+def bin_points(points, zooms, bins_per_tile):
+    """Count points per heatmap bin at every zoom level.
+
+    Returns an (n, 5) array of (zoom, tile_x, tile_y, bin_x, bin_y) keys and
+    the matching weights.
+    """
+    lat = np.radians(np.clip(points[:, 0], -MAX_MERCATOR_LAT, MAX_MERCATOR_LAT))
+    x = (points[:, 1] + 180) / 360
+    y = (1 - np.arcsinh(np.tan(lat)) / np.pi) / 2
+
+    keys, weights = [], []
+    for zoom in zooms:
+        scale = bins_per_tile * 2 ** zoom
+        px = np.clip((x * scale).astype(np.int64), 0, scale - 1)
+        py = np.clip((y * scale).astype(np.int64), 0, scale - 1)
+        # Unique on one int64 per bin is far cheaper than on (px, py) rows
+        cells, counts = np.unique(px * scale + py, return_counts=True)
+        px, py = cells // scale, cells % scale
+        keys.append(np.column_stack([np.full(len(cells), zoom), px // bins_per_tile, py // bins_per_tile,
+                                     px % bins_per_tile, py % bins_per_tile]))
+        weights.append(counts)
+    if not keys:
+        return np.empty((0, 5), dtype=np.int64), np.empty(0, dtype=np.int64)
+    # Columns come out as zoom, tile_x, tile_y, bin_x, bin_y
+    return np.concatenate(keys), np.concatenate(weights)
+
+
+def add_walks_to_heatmap(walks, config):
+    """Add walk value dicts to the heatmap bins and mark their tiles stale."""
+    points = [walk_points(walk, config['HEATMAP_SAMPLE_KM']) for walk in walks]
+    if not points:
+        return
+    keys, weights = bin_points(np.concatenate(points), config['HEATMAP_ZOOMS'], config['HEATMAP_BINS'])
+
+    # Plain executemany: these batches run to hundreds of thousands of rows
+    connection = db.session.connection()
+    connection.exec_driver_sql(
+        f"INSERT INTO heatmap_bin ({', '.join(BIN_COLUMNS)}, weight) VALUES (?, ?, ?, ?, ?, ?) "
+        f"ON CONFLICT ({', '.join(BIN_COLUMNS)}) DO UPDATE SET weight = weight + excluded.weight",
+        [(*key, weight) for key, weight in zip(keys.tolist(), weights.tolist())])
+    connection.exec_driver_sql(
+        "INSERT INTO heatmap_tile (zoom, x, y, stale) VALUES (?, ?, ?, 1) "
+        "ON CONFLICT (zoom, x, y) DO UPDATE SET stale = 1",
+        sorted(set(map(tuple, keys[:, :3].tolist()))))
+
+
+def queue_walks(walk_ids):
+    """Record saved walks for the next `flask build-heatmap` run to bin."""
+    if walk_ids:
+        stmt = insert(HeatmapPending).on_conflict_do_nothing()
+        db.session.execute(stmt, [{'walk_id': walk_id} for walk_id in walk_ids])
+
+
+def bin_pending_walks(config, chunk_size=1000):
+    """Bin every queued walk into the heatmap; returns how many were binned."""
+    binned = 0
+    while True:
+        ids = [walk_id for walk_id, in db.session.query(HeatmapPending.walk_id)
+               .order_by(HeatmapPending.walk_id).limit(chunk_size)]
+        if not ids:
+            return binned
+        walks = [row._asdict() for row in
+                 db.session.query(Walk.lat, Walk.lon, Walk.route).filter(Walk.id.in_(ids))]
+        add_walks_to_heatmap(walks, config)
+        HeatmapPending.query.filter(HeatmapPending.walk_id.in_(ids)).delete()
+        db.session.commit()
+        binned += len(walks)
+
+
+def tile_body(zoom, x, y, bins_per_tile, cells):
+    return json.dumps({
+        "z": zoom, "x": x, "y": y,
+        "bins": bins_per_tile,
+        "max": max((w for _, _, w in cells), default=0),
+        "cells": [[bx, by, w] for bx, by, w in cells]
+    }, separators=(',', ':'))
+
+
+def render_stale_tiles(config, batch_size=500):
+    """Render every stale tile; returns how many were rendered."""
+    rendered = 0
+    while True:
+        tiles = HeatmapTile.query.filter_by(stale=True).limit(batch_size).all()
+        if not tiles:
+            return rendered
+        # One query for the whole batch instead of one per tile
+        cells = defaultdict(list)
+        rows = (db.session.query(HeatmapBin.zoom, HeatmapBin.tile_x, HeatmapBin.tile_y,
+                                 HeatmapBin.bin_x, HeatmapBin.bin_y, HeatmapBin.weight)
+                .filter(tuple_(HeatmapBin.zoom, HeatmapBin.tile_x, HeatmapBin.tile_y)
+                        .in_([(t.zoom, t.x, t.y) for t in tiles]))
+                .order_by(HeatmapBin.bin_y, HeatmapBin.bin_x))
+        for zoom, x, y, bx, by, weight in rows:
+            cells[zoom, x, y].append((bx, by, weight))
+        for tile in tiles:
+            tile.body = tile_body(tile.zoom, tile.x, tile.y, config['HEATMAP_BINS'],
+                                  cells[tile.zoom, tile.x, tile.y])
+            tile.etag = hashlib.sha1(tile.body.encode()).hexdigest()
+            tile.stale = False
+        db.session.commit()
+        rendered += len(tiles)
+
+
+def rebuild_heatmap(config, chunk_size=10000):
+    HeatmapBin.query.delete()
+    HeatmapTile.query.delete()
+    HeatmapPending.query.delete()
+    rows = (db.session.query(Walk.lat, Walk.lon, Walk.route)
+            .order_by(Walk.id).yield_per(chunk_size))
+    chunk = []
+    for row in rows:
+        chunk.append(row._asdict())
+        if len(chunk) >= chunk_size:
+            add_walks_to_heatmap(chunk, config)
+            chunk = []
+    add_walks_to_heatmap(chunk, config)
+    db.session.commit()
+    return render_stale_tiles(config)
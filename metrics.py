@@ -0,0 +1,170 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+from urllib.parse import urlsplit
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(pairs):
+    return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in pairs) + '}' if pairs else ''
+
+
+class Histogram:
+    """Prometheus-style histogram keyed by a tuple of label values."""
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((labels, counts[:], total, count) for labels, (counts, total, count) in self._series.items())
+        for labels, counts, total, count in series:
+            pairs = list(zip(self.labelnames, labels))
+            cumulative = 0
+            for bound, bucket in zip(self.buckets, counts):
+                cumulative += bucket
+                lines.append(f"{self.name}_bucket{format_labels(pairs + [('le', bound)])} {cumulative}")
+            lines.append(f"{self.name}_bucket{format_labels(pairs + [('le', '+Inf')])} {count}")
+            lines.append(f"{self.name}_sum{format_labels(pairs)} {total}")
+            lines.append(f"{self.name}_count{format_labels(pairs)} {count}")
+        return '\n'.join(lines)
+
+
+class Span:
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.started
+        self.metrics.span_seconds.observe(elapsed, self.name)
+        if has_request_context() and 'metrics_spans' in g:
+            g.metrics_spans.append((self.name, elapsed))
+
+
+class Metrics:
+    """Request, span, database and upstream timings for /metrics.
+
+    Everything is skipped while enabled is False: span() hands back a
+    shared no-op context and the request and query hooks return at once.
+    With server_timing the per-request numbers are also sent back in a
+    Server-Timing header.
+    """
+
+    def __init__(self, enabled=False, server_timing=False, buckets=DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.server_timing = server_timing
+        self.request_seconds = Histogram(
+            'http_request_duration_seconds', 'Time spent handling requests.',
+            ('endpoint', 'method', 'status'), buckets)
+        self.span_seconds = Histogram(
+            'app_span_duration_seconds', 'Time spent in instrumented request stages.', ('span',), buckets)
+        self.db_query_seconds = Histogram(
+            'db_query_duration_seconds', 'SQL statement execution time.', (), buckets)
+        self.db_queries = Histogram(
+            'db_queries_per_request', 'SQL statements executed per request.', ('endpoint',), QUERY_COUNT_BUCKETS)
+        self.upstream_seconds = Histogram(
+            'upstream_request_duration_seconds', 'Upstream HTTP call time, including retries.',
+            ('host', 'method', 'status'), buckets)
+        self.histograms = [self.request_seconds, self.span_seconds, self.db_query_seconds,
+                           self.db_queries, self.upstream_seconds]
+        self._disabled_span = nullcontext()
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(enabled=config['METRICS_ENABLED'], server_timing=config['SERVER_TIMING_ENABLED'],
+                   buckets=config['METRICS_BUCKETS'])
+
+    def init_app(self, app, engine):
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+        event.listen(engine, 'before_cursor_execute', self.before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self.after_cursor_execute)
+
+    def span(self, name):
+        if not self.enabled:
+            return self._disabled_span
+        return Span(self, name)
+
+    def before_request(self):
+        if self.enabled:
+            g.metrics_started = time.perf_counter()
+            g.metrics_spans = []
+            g.metrics_db = [0, 0.0]
+
+    def after_request(self, response):
+        if not self.enabled or 'metrics_started' not in g:
+            return response
+        elapsed = time.perf_counter() - g.metrics_started
+        endpoint = request.endpoint or 'unmatched'
+        queries, db_seconds = g.metrics_db
+        self.request_seconds.observe(elapsed, endpoint, request.method, str(response.status_code))
+        self.db_queries.observe(queries, endpoint)
+        if self.server_timing:
+            timings = [f'{name};dur={seconds * 1000:.2f}' for name, seconds in g.metrics_spans]
+            timings.append(f'db;dur={db_seconds * 1000:.2f};desc="{queries} queries"')
+            timings.append(f'total;dur={elapsed * 1000:.2f}')
+            response.headers['Server-Timing'] = ', '.join(timings)
+        return response
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        # Kept on the statement's own context, so a statement that fails and
+        # never reaches after_cursor_execute leaves nothing behind
+        if self.enabled and context is not None:
+            context.metrics_started = time.perf_counter()
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, 'metrics_started', None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        self.db_query_seconds.observe(elapsed)
+        if has_request_context() and 'metrics_db' in g:
+            g.metrics_db[0] += 1
+            g.metrics_db[1] += elapsed
+
+    def observe_upstream(self, method, url, status, seconds):
+        if self.enabled:
+            self.upstream_seconds.observe(seconds, urlsplit(url).hostname or '', method, str(status))
+
+    def clear(self):
+        for histogram in self.histograms:
+            histogram.clear()
+
+    def render(self):
+        return '\n'.join(histogram.render() for histogram in self.histograms) + '\n'
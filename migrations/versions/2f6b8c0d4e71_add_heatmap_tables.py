@@ -0,0 +1,52 @@
+"""Add heatmap tables
+
+Revision ID: 2f6b8c0d4e71
+Revises: a93d5f61c2b8
+Create Date: 2026-10-17 14:08:31.284519
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2f6b8c0d4e71'
+down_revision = 'a93d5f61c2b8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Tables start empty; run `flask build-heatmap --rebuild` to fill them
+    # Skip tables an older db.create_all() already made
+    existing = sa.inspect(op.get_bind()).get_table_names()
+    if 'heatmap_bin' not in existing:
+        op.create_table('heatmap_bin',
+        sa.Column('zoom', sa.Integer(), nullable=False),
+        sa.Column('tile_x', sa.Integer(), nullable=False),
+        sa.Column('tile_y', sa.Integer(), nullable=False),
+        sa.Column('bin_x', sa.Integer(), nullable=False),
+        sa.Column('bin_y', sa.Integer(), nullable=False),
+        sa.Column('weight', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('zoom', 'tile_x', 'tile_y', 'bin_x', 'bin_y')
+        )
+    if 'heatmap_tile' not in existing:
+        op.create_table('heatmap_tile',
+        sa.Column('zoom', sa.Integer(), nullable=False),
+        sa.Column('x', sa.Integer(), nullable=False),
+        sa.Column('y', sa.Integer(), nullable=False),
+        sa.Column('body', sa.Text(), nullable=True),
+        sa.Column('etag', sa.String(length=40), nullable=True),
+        sa.Column('stale', sa.Boolean(), nullable=False),
+        sa.PrimaryKeyConstraint('zoom', 'x', 'y')
+        )
+        with op.batch_alter_table('heatmap_tile', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_heatmap_tile_stale'), ['stale'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('heatmap_tile', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_heatmap_tile_stale'))
+
+    op.drop_table('heatmap_tile')
+    op.drop_table('heatmap_bin')
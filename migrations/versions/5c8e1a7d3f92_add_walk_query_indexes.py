@@ -0,0 +1,32 @@
+"""Add walk query indexes
+
+Revision ID: 5c8e1a7d3f92
+Revises: b41f9c2e6d10
+Create Date: 2026-10-17 10:03:17.552931
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c8e1a7d3f92'
+down_revision = 'b41f9c2e6d10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Skip indexes an older db.create_all() already made
+    existing = {index['name'] for index in sa.inspect(op.get_bind()).get_indexes('walk')}
+    with op.batch_alter_table('walk', schema=None) as batch_op:
+        if 'ix_walk_timestamp_id' not in existing:
+            batch_op.create_index('ix_walk_timestamp_id', ['timestamp', 'id'], unique=False)
+        if 'ix_walk_distance_timestamp' not in existing:
+            batch_op.create_index('ix_walk_distance_timestamp', ['distance', 'timestamp'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('walk', schema=None) as batch_op:
+        batch_op.drop_index('ix_walk_distance_timestamp')
+        batch_op.drop_index('ix_walk_timestamp_id')
@@ -0,0 +1,75 @@
+"""Add geohash to Walk
+
+Revision ID: a93d5f61c2b8
+Revises: e7a2d94b0c35
+Create Date: 2026-10-17 12:41:52.630194
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a93d5f61c2b8'
+down_revision = 'e7a2d94b0c35'
+branch_labels = None
+depends_on = None
+
+ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+PRECISION = 9
+BATCH_SIZE = 1000
+
+walk = sa.table('walk', sa.column('id', sa.Integer), sa.column('lat', sa.Float),
+                sa.column('lon', sa.Float), sa.column('geohash', sa.String))
+
+
+def _geohash(lat, lon):
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, bit_count, even = [], 0, 0, True
+    while len(chars) < PRECISION:
+        interval, value = (lon_range, lon) if even else (lat_range, lat)
+        mid = (interval[0] + interval[1]) / 2
+        bits = (bits << 1) | (value >= mid)
+        interval[0 if value >= mid else 1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(ALPHABET[bits])
+            bits = bit_count = 0
+    return ''.join(chars)
+
+
+def upgrade():
+    # Skip the column and index if an older db.create_all() already made them
+    inspector = sa.inspect(op.get_bind())
+    columns = {column['name'] for column in inspector.get_columns('walk')}
+    indexes = {index['name'] for index in inspector.get_indexes('walk')}
+    with op.batch_alter_table('walk', schema=None) as batch_op:
+        if 'geohash' not in columns:
+            batch_op.add_column(sa.Column('geohash', sa.String(length=12), nullable=True))
+        if 'ix_walk_geohash' not in indexes:
+            batch_op.create_index('ix_walk_geohash', ['geohash'], unique=False)
+
+    conn = op.get_bind()
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(walk.c.id, walk.c.lat, walk.c.lon)
+            .where(walk.c.id > last_id)
+            .order_by(walk.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        conn.execute(
+            walk.update().where(walk.c.id == sa.bindparam('walk_id'))
+            .values(geohash=sa.bindparam('new_geohash')),
+            [{'walk_id': row.id, 'new_geohash': _geohash(row.lat, row.lon)} for row in rows]
+        )
+        last_id = rows[-1].id
+
+
+def downgrade():
+    with op.batch_alter_table('walk', schema=None) as batch_op:
+        batch_op.drop_index('ix_walk_geohash')
+        batch_op.drop_column('geohash')
@@ -0,0 +1,104 @@
+"""Encode walk routes as polylines
+
+Revision ID: b41f9c2e6d10
+Revises: 7aeb0c5eeb9a
+Create Date: 2026-10-17 09:12:40.118204
+
+"""
+import json
+
+from alembic import op
+import polyline
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b41f9c2e6d10'
+down_revision = '7aeb0c5eeb9a'
+branch_labels = None
+depends_on = None
+
+PRECISION = 5
+BATCH_SIZE = 1000
+
+walk = sa.table('walk', sa.column('id', sa.Integer), sa.column('route', sa.Text))
+
+
+def _is_coordinate_list(value):
+    return isinstance(value, list) and len(value) > 0 and all(
+        isinstance(point, list) and len(point) == 2 and
+        all(isinstance(c, (int, float)) and not isinstance(c, bool) for c in point)
+        for point in value)
+
+
+def _convert(convert_row):
+    conn = op.get_bind()
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(walk.c.id, walk.c.route)
+            .where(walk.c.id > last_id, walk.c.route.isnot(None))
+            .order_by(walk.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        updates = []
+        for row in rows:
+            converted = convert_row(row.route)
+            if converted is not None:
+                updates.append({'walk_id': row.id, 'new_route': converted})
+        if updates:
+            conn.execute(
+                walk.update().where(walk.c.id == sa.bindparam('walk_id'))
+                .values(route=sa.bindparam('new_route')),
+                updates
+            )
+        last_id = rows[-1].id
+
+
+def _to_polyline(route):
+    if not route.startswith('['):
+        return None
+    try:
+        coords = json.loads(route)
+    except ValueError:
+        return None
+    if not _is_coordinate_list(coords):
+        return None
+    return polyline.encode([tuple(point) for point in coords], PRECISION)
+
+
+def _to_json(route):
+    if route[0] in '[{"':
+        try:
+            json.loads(route)
+            return None
+        except ValueError:
+            pass
+    return json.dumps([list(point) for point in polyline.decode(route, PRECISION)])
+
+
+def upgrade():
+    # The app used to create the walk table with db.create_all() on startup, so a
+    # database stamped at an earlier revision may not have one yet
+    if not sa.inspect(op.get_bind()).has_table('walk'):
+        op.create_table('walk',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('lat', sa.Float(), nullable=False),
+        sa.Column('lon', sa.Float(), nullable=False),
+        sa.Column('distance', sa.Float(), nullable=False),
+        sa.Column('duration', sa.Float(), nullable=True),
+        sa.Column('timestamp', sa.DateTime(), nullable=True),
+        sa.Column('temperature', sa.Float(), nullable=True),
+        sa.Column('condition', sa.String(length=50), nullable=True),
+        sa.Column('dog_parks_visited', sa.Text(), nullable=True),
+        sa.Column('difficulty', sa.String(length=20), nullable=True),
+        sa.Column('route', sa.Text(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+    _convert(_to_polyline)
+
+
+def downgrade():
+    _convert(_to_json)
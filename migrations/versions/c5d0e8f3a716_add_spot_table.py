@@ -0,0 +1,43 @@
+"""Add spot table
+
+Revision ID: c5d0e8f3a716
+Revises: 2f6b8c0d4e71
+Create Date: 2026-10-17 15:32:09.771043
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5d0e8f3a716'
+down_revision = '2f6b8c0d4e71'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Skip the table if an older db.create_all() already made it
+    if sa.inspect(op.get_bind()).has_table('spot'):
+        return
+    op.create_table('spot',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('osm_id', sa.BigInteger(), nullable=False),
+    sa.Column('category', sa.String(length=30), nullable=False),
+    sa.Column('type', sa.String(length=30), nullable=False),
+    sa.Column('name', sa.String(length=200), nullable=False),
+    sa.Column('lat', sa.Float(), nullable=False),
+    sa.Column('lon', sa.Float(), nullable=False),
+    sa.Column('geohash', sa.String(length=12), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('osm_id', 'category', name='uq_spot_osm_id_category')
+    )
+    with op.batch_alter_table('spot', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_spot_geohash'), ['geohash'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('spot', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_spot_geohash'))
+
+    op.drop_table('spot')
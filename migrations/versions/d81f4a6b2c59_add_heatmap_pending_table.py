@@ -0,0 +1,30 @@
+"""Add heatmap pending table
+
+Revision ID: d81f4a6b2c59
+Revises: c5d0e8f3a716
+Create Date: 2026-10-18 09:12:44.105318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd81f4a6b2c59'
+down_revision = 'c5d0e8f3a716'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Skip the table if an older db.create_all() already made it
+    if sa.inspect(op.get_bind()).has_table('heatmap_pending'):
+        return
+    op.create_table('heatmap_pending',
+    sa.Column('walk_id', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('walk_id')
+    )
+
+
+def downgrade():
+    op.drop_table('heatmap_pending')
@@ -0,0 +1,52 @@
+"""Add walk rollup table
+
+Revision ID: e7a2d94b0c35
+Revises: 5c8e1a7d3f92
+Create Date: 2026-10-17 11:26:05.407716
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7a2d94b0c35'
+down_revision = '5c8e1a7d3f92'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # An older db.create_all() may already have made the table; its rows only
+    # cover walks saved since then, so it is refilled from scratch below
+    if sa.inspect(op.get_bind()).has_table('walk_rollup'):
+        op.execute("DELETE FROM walk_rollup")
+    else:
+        op.create_table('walk_rollup',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('difficulty', sa.String(length=20), nullable=False),
+        sa.Column('condition', sa.String(length=50), nullable=False),
+        sa.Column('distance_bucket', sa.Integer(), nullable=False),
+        sa.Column('duration_bucket', sa.Integer(), nullable=False),
+        sa.Column('walks', sa.Integer(), nullable=False),
+        sa.Column('total_distance', sa.Float(), nullable=False),
+        sa.Column('total_duration', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('day', 'difficulty', 'condition', 'distance_bucket', 'duration_bucket')
+        )
+
+    # Backfill from existing walks; buckets match stats.rollup_key
+    op.execute("""
+        INSERT INTO walk_rollup (day, difficulty, condition, distance_bucket, duration_bucket,
+                                 walks, total_distance, total_duration)
+        SELECT date(timestamp), coalesce(difficulty, ''), coalesce(condition, ''),
+               min(CAST(distance AS INTEGER), 20),
+               min(CAST(coalesce(duration, 0) / 900 AS INTEGER), 16),
+               count(*), sum(distance), sum(coalesce(duration, 0))
+        FROM walk
+        WHERE timestamp IS NOT NULL
+        GROUP BY 1, 2, 3, 4, 5
+    """)
+
+
+def downgrade():
+    op.drop_table('walk_rollup')
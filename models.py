@@ -2,9 +2,103 @@ from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 import json
 
+import numpy as np
+import polyline
+
+from geo import encode_geohash
+
 db = SQLAlchemy()
 
+
+def use_sqlite_pragmas(engine, pragmas):
+    """Run PRAGMA name=value for each of pragmas on every new connection."""
+    if not pragmas or engine.dialect.name != 'sqlite':
+        return
+
+    @db.event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+ROUTE_PRECISION = 5
+GEOHASH_PRECISION = 9
+
+
+def is_coordinate_list(value):
+    return isinstance(value, (list, tuple)) and len(value) > 0 and all(
+        isinstance(point, (list, tuple)) and len(point) == 2 and
+        all(isinstance(c, (int, float)) and not isinstance(c, bool) for c in point)
+        for point in value)
+
+
+def encode_route(route):
+    """Serialize a route for the Walk.route column.
+
+    Coordinate lists (or JSON strings of them) are stored as an encoded
+    polyline; anything else is kept as JSON like before.
+    """
+    if not route:
+        return None
+    coords = route
+    if isinstance(route, str):
+        try:
+            coords = json.loads(route)
+        except ValueError:
+            return json.dumps(route)
+    if is_coordinate_list(coords):
+        return polyline.encode([tuple(point) for point in coords], ROUTE_PRECISION)
+    return json.dumps(route)
+
+
+def encode_routes(routes):
+    """Vectorized encode_route for an (n, points, 2) array of routes.
+
+    Produces the same polyline strings as encode_route, for bulk loads.
+    """
+    routes = np.asarray(routes, dtype=float)
+    count = len(routes)
+    # Polylines round half away from zero, then store deltas between points
+    scaled = np.copysign(np.floor(np.abs(routes) * 10 ** ROUTE_PRECISION + 0.5), routes).astype(np.int64)
+    deltas = np.diff(scaled, axis=1, prepend=0).reshape(count, -1)
+    values = np.where(deltas < 0, ~(deltas << 1), deltas << 1)
+
+    shifts = 5 * np.arange(7)
+    chunks = (values[..., None] >> shifts) & 0x1f
+    chunk_count = 1 + ((values[..., None] >> shifts[1:]) > 0).sum(axis=-1)
+    position = np.arange(7)
+    more = position < (chunk_count - 1)[..., None]
+    encoded = ((chunks | np.where(more, 0x20, 0)) + 63).astype(np.uint8)
+    used = position < chunk_count[..., None]
+
+    text = encoded[used].tobytes().decode('ascii')
+    ends = np.cumsum(used.reshape(count, -1).sum(axis=1)).tolist()
+    return [text[start:end] for start, end in zip([0] + ends[:-1], ends)]
+
+
+def decode_route(stored):
+    """Read a Walk.route value in either the polyline or the legacy JSON format."""
+    if not stored:
+        return None
+    # Polyline characters never form a JSON document apart from the trivial
+    # "[]" / "{}", so a successful JSON parse means a legacy row
+    if stored[0] in '[{"':
+        try:
+            return json.loads(stored)
+        except ValueError:
+            pass
+    return polyline.decode(stored, ROUTE_PRECISION)
+
+
 class Walk(db.Model):
+    # Walk history is listed newest first, optionally filtered by date or distance
+    __table_args__ = (
+        db.Index('ix_walk_timestamp_id', 'timestamp', 'id'),
+        db.Index('ix_walk_distance_timestamp', 'distance', 'timestamp'),
+        db.Index('ix_walk_geohash', 'geohash'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     lat = db.Column(db.Float, nullable=False)
     lon = db.Column(db.Float, nullable=False)
@@ -16,6 +110,71 @@ class Walk(db.Model):
     dog_parks_visited = db.Column(db.Text)  # Storing as JSON string
     difficulty = db.Column(db.String(20))  # easy, medium, hard
     route = db.Column(db.Text, nullable=True)
+    geohash = db.Column(db.String(12))  # start point, for "walks near me" lookups
+
+    @property
+    def route_coordinates(self):
+        return decode_route(self.route)
 
     def __repr__(self):
-        return f"<Walk {self.id} at ({self.lat}, {self.lon})>"
\ No newline at end of file
+        return f"<Walk {self.id} at ({self.lat}, {self.lon})>"
+
+
+@db.event.listens_for(Walk, 'before_insert')
+@db.event.listens_for(Walk, 'before_update')
+def set_walk_geohash(mapper, connection, walk):
+    if walk.lat is not None and walk.lon is not None:
+        walk.geohash = encode_geohash(walk.lat, walk.lon, GEOHASH_PRECISION)
+
+
+class WalkRollup(db.Model):
+    """Per-day walk aggregates, kept up to date as walks are saved."""
+    day = db.Column(db.Date, primary_key=True)
+    difficulty = db.Column(db.String(20), primary_key=True)
+    condition = db.Column(db.String(50), primary_key=True)
+    distance_bucket = db.Column(db.Integer, primary_key=True)  # whole km
+    duration_bucket = db.Column(db.Integer, primary_key=True)  # 15 minute slots
+    walks = db.Column(db.Integer, nullable=False, default=0)
+    total_distance = db.Column(db.Float, nullable=False, default=0)
+    total_duration = db.Column(db.Float, nullable=False, default=0)
+
+
+class HeatmapBin(db.Model):
+    """Walk density for one bin of a z/x/y map tile."""
+    zoom = db.Column(db.Integer, primary_key=True)
+    tile_x = db.Column(db.Integer, primary_key=True)
+    tile_y = db.Column(db.Integer, primary_key=True)
+    bin_x = db.Column(db.Integer, primary_key=True)
+    bin_y = db.Column(db.Integer, primary_key=True)
+    weight = db.Column(db.Float, nullable=False, default=0)
+
+
+class HeatmapPending(db.Model):
+    """Walk saved since the last heatmap build, waiting to be binned."""
+    walk_id = db.Column(db.Integer, primary_key=True)
+
+
+class HeatmapTile(db.Model):
+    """Rendered heatmap tile JSON, re-rendered by the heatmap job when stale."""
+    zoom = db.Column(db.Integer, primary_key=True)
+    x = db.Column(db.Integer, primary_key=True)
+    y = db.Column(db.Integer, primary_key=True)
+    body = db.Column(db.Text)
+    etag = db.Column(db.String(40))
+    stale = db.Column(db.Boolean, nullable=False, default=True, index=True)
+
+
+class Spot(db.Model):
+    """Dog-friendly point of interest imported from an OSM extract."""
+    __table_args__ = (
+        db.UniqueConstraint('osm_id', 'category', name='uq_spot_osm_id_category'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    osm_id = db.Column(db.BigInteger, nullable=False)
+    category = db.Column(db.String(30), nullable=False)  # the tag selector it matched
+    type = db.Column(db.String(30), nullable=False)
+    name = db.Column(db.String(200), nullable=False, default='Unnamed')
+    lat = db.Column(db.Float, nullable=False)
+    lon = db.Column(db.Float, nullable=False)
+    geohash = db.Column(db.String(12), nullable=False, index=True)
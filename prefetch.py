@@ -0,0 +1,98 @@
+import logging
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+
+from models import Walk, db
+
+logger = logging.getLogger(__name__)
+
+
+def top_walk_locations(limit, days, precision):
+    """Average start point of the busiest geohash cells over the last days."""
+    cell = func.substr(Walk.geohash, 1, precision)
+    since = datetime.utcnow() - timedelta(days=days)
+    rows = (db.session.query(func.avg(Walk.lat), func.avg(Walk.lon))
+            .filter(Walk.timestamp >= since, Walk.geohash.isnot(None))
+            .group_by(cell)
+            .order_by(func.count().desc(), cell)
+            .limit(limit).all())
+    return [(lat, lon) for lat, lon in rows]
+
+
+class Prefetcher:
+    """Keeps the weather and spot caches warm for hot locations.
+
+    Every interval seconds each service is asked to warm its cache cell
+    around every location returned by locations(). Services skip cells that
+    stay fresh for at least margin seconds; the upstream calls that do
+    happen are spaced to at most max_rate per second. The caches live in
+    each process, so every serving process runs its own prefetcher and
+    max_rate applies per process.
+    """
+
+    def __init__(self, services, locations, interval, margin, max_rate):
+        self.services = services
+        self.locations = locations
+        self.interval = interval
+        self.margin = margin
+        self.max_rate = max_rate
+        self._stop = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.runs = 0
+        self.refreshed = 0
+        self.errors = 0
+
+    def run_once(self):
+        refreshed = 0
+        for lat, lon in self.locations():
+            for service in self.services:
+                if self._stop.is_set():
+                    return refreshed
+                try:
+                    called = service.warm(lat, lon, self.margin)
+                except Exception as e:
+                    self.errors += 1
+                    called = True
+                    logger.warning("Prefetch for (%s, %s) failed: %s", lat, lon, e)
+                if called:
+                    refreshed += 1
+                    self._stop.wait(1 / self.max_rate)
+        self.runs += 1
+        self.refreshed += refreshed
+        return refreshed
+
+    def start(self):
+        # Concurrent first requests may all call start; only one thread may run
+        with self._start_lock:
+            if not self.running:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._loop, name='prefetch', daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("Prefetch run failed")
+            self._stop.wait(self.interval)
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def stats(self):
+        return {
+            "running": self.running,
+            "runs": self.runs,
+            "refreshed": self.refreshed,
+            "errors": self.errors
+        }
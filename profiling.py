@@ -0,0 +1,90 @@
+import cProfile
+import logging
+import os
+import random
+import threading
+import time
+from functools import wraps
+
+from flask import request
+
+logger = logging.getLogger(__name__)
+
+
+class Profiler:
+    """Opt-in cProfile capture for selected views.
+
+    While enabled, a request is profiled when it carries header with the
+    configured token or, failing that, with probability sample_rate. Each
+    profile is written as a pstats file to directory, and the oldest files
+    are removed once the directory grows past max_bytes. Only one request
+    is profiled at a time; others run unprofiled meanwhile.
+    """
+
+    def __init__(self, directory, max_bytes, enabled=False, sample_rate=0.0, header='X-Profile', token=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.header = header
+        self.token = token
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(directory=config['PROFILE_DIR'], max_bytes=config['PROFILE_DIR_MAX_BYTES'],
+                   enabled=config['PROFILING_ENABLED'], sample_rate=config['PROFILE_SAMPLE_RATE'],
+                   header=config['PROFILE_HEADER'], token=config['PROFILE_HEADER_TOKEN'])
+
+    def wanted(self):
+        if self.token and request.headers.get(self.header) == self.token:
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def profile(self, view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not self.enabled or not self.wanted() or not self._lock.acquire(blocking=False):
+                return view(*args, **kwargs)
+            try:
+                profile = cProfile.Profile()
+                response = profile.runcall(view, *args, **kwargs)
+                try:
+                    self.save(profile, view.__name__)
+                except Exception:
+                    # The view already succeeded; a lost profile must not fail it
+                    logger.exception("Saving profile for %s failed", view.__name__)
+            finally:
+                self._lock.release()
+            return response
+        return wrapper
+
+    def save(self, profile, name):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{time.strftime('%Y%m%dT%H%M%S')}-{time.time_ns() % 10**9:09d}"
+                                            f"-{os.getpid()}-{name}.prof")
+        profile.dump_stats(path)
+        self.rotate()
+        return path
+
+    def rotate(self):
+        # Other workers rotate the same directory, so files can vanish under us
+        files = []
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith('.prof'):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        for _, size, path in files[:-1]:
+            if total <= self.max_bytes:
+                break
+            total -= size
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
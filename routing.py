@@ -0,0 +1,171 @@
+import numpy as np
+
+KM_PER_DEGREE = 111
+MAX_TURN_DEGREES = 45
+LOOP_JITTER_DEGREES = 30
+# Route lengths /generate-route accepts
+MIN_ROUTE_KM = 0.5
+MAX_ROUTE_KM = 10
+
+
+def route_difficulty(distances_km):
+    """'easy' up to 2 km, 'medium' up to 4 km, 'hard' beyond; a str for a scalar."""
+    distances = np.asarray(distances_km)
+    difficulty = np.select([distances <= 2, distances <= 4], ['easy', 'medium'], 'hard')
+    return difficulty if difficulty.ndim else str(difficulty)
+
+
+def generate_routes(lat, lon, distances_km, steps=10, rng=None):
+    """Generate one random-walk route per entry in distances_km in a single pass.
+
+    Returns an array of shape (len(distances_km), steps + 1, 2) holding
+    (lat, lon) points, each route starting at the given coordinate. lat and
+    lon may also be arrays giving every route its own start.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    distances = np.asarray(distances_km, dtype=float).reshape(-1, 1)
+    count = len(distances)
+    lat = np.broadcast_to(np.asarray(lat, dtype=float).reshape(-1, 1), (count, 1))
+    lon = np.broadcast_to(np.asarray(lon, dtype=float).reshape(-1, 1), (count, 1))
+
+    start_bearings = rng.uniform(0, 360, size=(count, 1))
+    turns = rng.uniform(-MAX_TURN_DEGREES, MAX_TURN_DEGREES, size=(count, steps))
+    bearings = np.radians((start_bearings + np.cumsum(turns, axis=1)) % 360)
+    segment_length = distances / steps
+
+    delta_lat = (segment_length / KM_PER_DEGREE) * np.cos(bearings)
+    lats = lat + np.cumsum(delta_lat, axis=1)
+    # Longitude degrees shrink with the latitude each step starts from
+    step_lats = np.concatenate([lat, lats[:, :-1]], axis=1)
+    delta_lon = (segment_length / (KM_PER_DEGREE * np.cos(np.radians(step_lats)))) * np.sin(bearings)
+    lons = lon + np.cumsum(delta_lon, axis=1)
+
+    routes = np.empty((count, steps + 1, 2))
+    routes[:, 0, 0] = lat[:, 0]
+    routes[:, 0, 1] = lon[:, 0]
+    routes[:, 1:, 0] = lats
+    routes[:, 1:, 1] = lons
+    return routes
+
+
+def generate_loop_routes(lat, lon, distances_km, steps=10, rng=None):
+    """Generate closed-loop routes that start and end at the given coordinate.
+
+    Bearings sweep a full circle with random jitter. The leftover gap
+    between the last point and the start is then spread evenly over all
+    steps, which closes every loop exactly without rejection sampling.
+    Finally, each loop is scaled so its length matches the requested
+    distance. Returns the same (count, steps + 1, 2) array as
+    generate_routes.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    distances = np.asarray(distances_km, dtype=float).reshape(-1, 1)
+    count = len(distances)
+
+    start_bearings = rng.uniform(0, 360, size=(count, 1))
+    directions = rng.choice([-1, 1], size=(count, 1))
+    sweep = directions * np.arange(steps) * (360 / steps)
+    jitter = rng.uniform(-LOOP_JITTER_DEGREES, LOOP_JITTER_DEGREES, size=(count, steps))
+    bearings = np.radians(start_bearings + sweep + jitter)
+
+    north = np.cumsum(np.cos(bearings), axis=1)
+    east = np.cumsum(np.sin(bearings), axis=1)
+    closure = np.arange(1, steps + 1) / steps
+    north -= closure * north[:, -1:]
+    east -= closure * east[:, -1:]
+
+    segments = np.hypot(np.diff(north, axis=1, prepend=0), np.diff(east, axis=1, prepend=0))
+    scale = distances / segments.sum(axis=1, keepdims=True)
+
+    routes = np.empty((count, steps + 1, 2))
+    routes[:, 0] = (lat, lon)
+    routes[:, 1:, 0] = lat + north * scale / KM_PER_DEGREE
+    routes[:, 1:, 1] = lon + east * scale / (KM_PER_DEGREE * np.cos(np.radians(lat)))
+    routes[:, -1] = (lat, lon)
+    return routes
+
+
+class SpotIndex:
+    """Uniform grid index over spot locations for fast radius queries.
+
+    Spots are projected to local kilometre offsets and sorted by grid cell,
+    so every point only has to look at the spots in its own and the eight
+    neighbouring cells instead of the full spot list.
+    """
+
+    def __init__(self, spots, origin_lat, cell_km):
+        self.origin_lat = origin_lat
+        self.cell_km = cell_km
+        latlon = np.array([(spot['lat'], spot['lon']) for spot in spots], dtype=float).reshape(-1, 2)
+        xy = self._project(latlon)
+        keys = self._cell_keys(np.floor(xy / cell_km).astype(np.int64))
+        self.order = np.argsort(keys, kind='stable')
+        self.keys = keys[self.order]
+        self.xy = xy[self.order]
+
+    def _project(self, latlon):
+        return np.stack([
+            latlon[..., 0] * KM_PER_DEGREE,
+            latlon[..., 1] * KM_PER_DEGREE * np.cos(np.radians(self.origin_lat))
+        ], axis=-1)
+
+    @staticmethod
+    def _cell_keys(cells):
+        return cells[..., 0] * (1 << 32) + cells[..., 1]
+
+    def pairs_within(self, points, radius_km):
+        """Return (point_indices, spot_indices) for every spot within radius_km of a point."""
+        if radius_km > self.cell_km:
+            raise ValueError("radius_km must not exceed the index cell size")
+        xy = self._project(np.asarray(points, dtype=float).reshape(-1, 2))
+        cells = np.floor(xy / self.cell_km).astype(np.int64)
+
+        point_hits, spot_hits = [], []
+        for d_row in (-1, 0, 1):
+            for d_col in (-1, 0, 1):
+                keys = self._cell_keys(cells + (d_row, d_col))
+                lo = np.searchsorted(self.keys, keys, side='left')
+                counts = np.searchsorted(self.keys, keys, side='right') - lo
+                total = counts.sum()
+                if not total:
+                    continue
+                point_idx = np.repeat(np.arange(len(keys)), counts)
+                starts = np.repeat(lo - (np.cumsum(counts) - counts), counts)
+                spot_pos = np.arange(total) + starts
+                near = np.hypot(*(xy[point_idx] - self.xy[spot_pos]).T) <= radius_km
+                point_hits.append(point_idx[near])
+                spot_hits.append(self.order[spot_pos[near]])
+
+        if not point_hits:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        return np.concatenate(point_hits), np.concatenate(spot_hits)
+
+
+def score_routes(routes, spots, weights, radius_km):
+    """Score each route by the weighted spots it passes within radius_km.
+
+    Returns (scores, passed) where passed[i] lists the indices into spots
+    that route i comes near, each spot counted once per route.
+    """
+    routes = np.asarray(routes, dtype=float)
+    count, length = routes.shape[:2]
+    scores = np.zeros(count)
+    passed = [[] for _ in range(count)]
+    if not spots:
+        return scores, passed
+
+    index = SpotIndex(spots, routes[0, 0, 0], cell_km=radius_km)
+    point_idx, spot_idx = index.pairs_within(routes.reshape(-1, 2), radius_km)
+    pairs = np.unique((point_idx // length) * len(spots) + spot_idx)
+    route_idx, spot_idx = np.divmod(pairs, len(spots))
+
+    spot_weights = np.array([weights.get(spot['type'], 0) for spot in spots], dtype=float)
+    np.add.at(scores, route_idx, spot_weights[spot_idx])
+    for route, spot in zip(route_idx.tolist(), spot_idx.tolist()):
+        passed[route].append(spot)
+    return scores, passed
+
+
+def create_route_coordinates(lat, lon, distance_km, steps=10):
+    route = generate_routes(lat, lon, [distance_km], steps)[0]
+    return [tuple(point) for point in route.tolist()]
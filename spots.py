@@ -0,0 +1,238 @@
+import json
+import math
+import xml.etree.ElementTree as ET
+from collections import namedtuple
+
+import numpy as np
+from sqlalchemy import and_, or_
+from sqlalchemy.dialects.sqlite import insert
+
+from cache import SingleFlight, TTLCache, cell_center, grid_cell, stale_while_revalidate
+from geo import GEOHASH_END, encode_geohash, geohash_cells, haversine_km, radius_bbox
+from models import GEOHASH_PRECISION, Spot, db
+
+OVERPASS_URL = "http://overpass-api.de/api/interpreter"
+
+# category -> the OSM (key, value) tag that selects it
+SPOT_TAGS = {
+    'dog_park': ('leisure', 'dog_park'),
+    'pet': ('shop', 'pet'),
+    'drinking_water': ('amenity', 'drinking_water'),
+    'waste_basket': ('amenity', 'waste_basket'),
+    'dog_waste_bin': ('waste', 'dog_waste_bin'),
+}
+
+
+class SpotRecord(namedtuple('SpotRecord', 'osm_id lat lon category type name')):
+    __slots__ = ()
+
+    def as_json(self):
+        return {"lat": self.lat, "lon": self.lon, "type": self.type, "name": self.name}
+
+
+def match_spot(osm_id, lat, lon, tags):
+    """Yield one SpotRecord per category an OSM element's tags match."""
+    spot_type = tags.get('leisure') or tags.get('shop') or tags.get('amenity') or tags.get('waste')
+    for category, (key, value) in SPOT_TAGS.items():
+        if tags.get(key) == value:
+            yield SpotRecord(osm_id, lat, lon, category, spot_type, tags.get('name', 'Unnamed'))
+
+
+class SpotSet:
+    """Immutable spot list with coordinate arrays for radius filtering."""
+    __slots__ = ('records', 'lats', 'lons', 'categories')
+
+    def __init__(self, records):
+        self.records = tuple(records)
+        self.lats = np.array([r.lat for r in self.records], dtype=float)
+        self.lons = np.array([r.lon for r in self.records], dtype=float)
+        self.categories = np.array([r.category for r in self.records], dtype=object)
+
+    def __len__(self):
+        return len(self.records)
+
+    def within(self, lat, lon, radius_m, categories):
+        """Spots of the given categories within radius_m, one per OSM element."""
+        if not self.records:
+            return []
+        mask = haversine_km(lat, lon, self.lats, self.lons) <= radius_m / 1000
+        mask &= np.isin(self.categories, list(categories))
+        spots = []
+        seen = set()
+        for i in np.flatnonzero(mask):
+            record = self.records[i]
+            key = (record.osm_id, record.lat, record.lon)
+            if key not in seen:
+                seen.add(key)
+                spots.append(record)
+        return spots
+
+
+def overpass_query(lat, lon, radius_m, categories):
+    selectors = ''.join(f'\n      node["{key}"="{value}"](around:{radius_m},{lat},{lon});'
+                        for key, value in (SPOT_TAGS[c] for c in categories))
+    return f"""
+    [out:json];
+    ({selectors}
+    );
+    out body;
+    """
+
+
+class SpotService:
+    """Dog-friendly spot lookups shared by /generate-route and /dog-spots.
+
+    Overpass is queried once per grid cell for every category at
+    fetch_radius_m, widened by half the cell diagonal so the result covers
+    that radius around any point inside the cell. Callers then filter the
+    cached set down to their own point, radius and categories. With the
+    "local" source the imported spot table is queried instead.
+
+    Overpass calls go through breaker when one is given; expired cells are
+    served for up to stale_ttl seconds while executor refreshes them.
+    """
+
+    def __init__(self, http, source, fetch_radius_m, ttl, maxsize, cell_degrees,
+                 overpass_url=OVERPASS_URL, max_cells=16, breaker=None, stale_ttl=0, executor=None):
+        self.http = http
+        self.breaker = breaker
+        self.executor = executor
+        self.source = source
+        self.fetch_radius_m = fetch_radius_m
+        self.cell_degrees = cell_degrees
+        self.overpass_url = overpass_url
+        self.max_cells = max_cells
+        self.cache = TTLCache(ttl=ttl, maxsize=maxsize, stale_ttl=stale_ttl)
+        self.flight = SingleFlight()
+        cell_half_diagonal_m = cell_degrees * 111000 * math.sqrt(2) / 2
+        self.query_radius_m = math.ceil(fetch_radius_m + cell_half_diagonal_m)
+
+    def nearby(self, lat, lon, radius_m, categories):
+        if radius_m > self.fetch_radius_m:
+            raise ValueError(f"radius_m must not exceed {self.fetch_radius_m}")
+        if self.source == 'local':
+            return self.from_table(lat, lon, radius_m, categories).within(lat, lon, radius_m, categories)
+
+        cell = grid_cell(lat, lon, self.cell_degrees)
+        spot_set = stale_while_revalidate(self.cache, self.flight, cell, self.refresh, self.executor)
+        return spot_set.within(lat, lon, radius_m, categories)
+
+    def warm(self, lat, lon, margin):
+        """Refresh the cell around (lat, lon) unless it stays fresh for margin seconds.
+
+        Returns True when an upstream call was made.
+        """
+        if self.source == 'local':
+            return False
+        cell = grid_cell(lat, lon, self.cell_degrees)
+        if self.cache.fresh_for(cell) > margin:
+            return False
+        self.flight.do(cell, self.refresh, cell)
+        return True
+
+    def refresh(self, cell):
+        if self.breaker is None:
+            spot_set = self.fetch(cell)
+        else:
+            spot_set = self.breaker.call(self.fetch, cell)
+        self.cache.set(cell, spot_set)
+        return spot_set
+
+    def fetch(self, cell):
+        lat, lon = cell_center(cell, self.cell_degrees)
+        query = overpass_query(lat, lon, self.query_radius_m, SPOT_TAGS)
+        response = self.http.post(self.overpass_url, data={"data": query})
+        response.raise_for_status()
+        spot_set = SpotSet(record
+                           for el in response.json().get("elements", [])
+                           if 'lat' in el
+                           for record in match_spot(el.get('id'), el['lat'], el['lon'], el.get('tags', {})))
+        return spot_set
+
+    def from_table(self, lat, lon, radius_m, categories):
+        min_lat, min_lon, max_lat, max_lon = radius_bbox(lat, lon, radius_m / 1000)
+        cells = geohash_cells(min_lat, min_lon, max_lat, max_lon, self.max_cells)
+        rows = (db.session.query(Spot.osm_id, Spot.lat, Spot.lon, Spot.category, Spot.type, Spot.name)
+                .filter(
+                    or_(*[and_(Spot.geohash >= cell, Spot.geohash < cell + GEOHASH_END) for cell in cells]),
+                    Spot.lat.between(min_lat, max_lat),
+                    Spot.lon.between(min_lon, max_lon),
+                    Spot.category.in_(categories))
+                .order_by(Spot.osm_id).all())
+        return SpotSet(SpotRecord(*row) for row in rows)
+
+
+def parse_overpass_json(path):
+    with open(path) as f:
+        elements = json.load(f).get('elements', [])
+    for el in elements:
+        # Ways and relations exported with "out center" carry a center point
+        point = el if 'lat' in el else el.get('center')
+        if point:
+            yield from match_spot(el['id'], point['lat'], point['lon'], el.get('tags', {}))
+
+
+def parse_osm_xml(path):
+    # Streams the file; only tagged nodes are imported. Finished elements are
+    # dropped from the root <osm> too, or it would keep every one of them
+    root = None
+    for event, el in ET.iterparse(path, events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = el
+            continue
+        if el.tag == 'node':
+            tags = {tag.get('k'): tag.get('v') for tag in el.iter('tag')}
+            if tags:
+                yield from match_spot(int(el.get('id')), float(el.get('lat')), float(el.get('lon')), tags)
+        if el.tag in ('node', 'way', 'relation'):
+            el.clear()
+            root.clear()
+
+
+def parse_osm_pbf(path):
+    try:
+        import osmium
+    except ImportError:
+        raise RuntimeError("Reading .osm.pbf files requires the 'osmium' package")
+
+    for node in osmium.FileProcessor(path, osmium.osm.NODE):
+        if node.tags:
+            yield from match_spot(node.id, node.location.lat, node.location.lon,
+                                  {tag.k: tag.v for tag in node.tags})
+
+
+def parse_spot_file(path):
+    if path.endswith('.pbf'):
+        return parse_osm_pbf(path)
+    if path.endswith('.json'):
+        return parse_overpass_json(path)
+    return parse_osm_xml(path)
+
+
+def import_spots(path, bbox=None, replace=False, batch_size=1000):
+    """Load spots from an OSM extract into the spot table; returns the row count."""
+    if replace:
+        Spot.query.delete()
+
+    stmt = insert(Spot)
+    upsert = stmt.on_conflict_do_update(
+        index_elements=['osm_id', 'category'],
+        set_={column: stmt.excluded[column] for column in ('type', 'name', 'lat', 'lon', 'geohash')}
+    )
+
+    imported = 0
+    batch = []
+    for record in parse_spot_file(path):
+        if bbox and not (bbox[0] <= record.lat <= bbox[2] and bbox[1] <= record.lon <= bbox[3]):
+            continue
+        batch.append(dict(record._asdict(), geohash=encode_geohash(record.lat, record.lon, GEOHASH_PRECISION)))
+        if len(batch) >= batch_size:
+            db.session.execute(upsert, batch)
+            imported += len(batch)
+            batch = []
+    if batch:
+        db.session.execute(upsert, batch)
+        imported += len(batch)
+    db.session.commit()
+    return imported
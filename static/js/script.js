@@ -19,6 +19,35 @@ L.tileLayer('https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png', {
   maxZoom: 19
 }).addTo(map);
 
+// Walk heatmap drawn from the precomputed /heatmap/{z}/{x}/{y}.json tiles
+const HeatmapLayer = L.GridLayer.extend({
+  createTile(coords, done) {
+    const tile = document.createElement('canvas');
+    const size = this.getTileSize();
+    tile.width = size.x;
+    tile.height = size.y;
+
+    fetch(`/heatmap/${coords.z}/${coords.x}/${coords.y}.json`)
+      .then(res => (res.status === 200 ? res.json() : null))
+      .then(data => {
+        if (data && data.max > 0) {
+          const ctx = tile.getContext('2d');
+          const cell = size.x / data.bins;
+          data.cells.forEach(([bx, by, weight]) => {
+            ctx.fillStyle = `rgba(255, 80, 0, ${0.15 + 0.7 * weight / data.max})`;
+            ctx.fillRect(bx * cell, by * cell, cell, cell);
+          });
+        }
+        done(null, tile);
+      })
+      .catch(err => done(err, tile));
+    return tile;
+  }
+});
+
+const heatmapLayer = new HeatmapLayer({ minZoom: 10, maxNativeZoom: 16, opacity: 0.6 });
+L.control.layers(null, { 'Walk heatmap': heatmapLayer }).addTo(map);
+
 let routeLayers = [];  // ⬅ Store multiple routes
 let spotsLayer = null;
 let selectedRouteIndex = null;
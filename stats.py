@@ -0,0 +1,121 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, text
+from sqlalchemy.dialects.sqlite import insert
+
+from models import db, WalkRollup
+
+DURATION_BUCKET_SECONDS = 15 * 60
+MAX_DISTANCE_BUCKET = 20
+MAX_DURATION_BUCKET = 16
+
+PERIOD_FORMATS = {
+    'day': '%Y-%m-%d',
+    'week': '%Y-%m-%d',
+    'month': '%Y-%m'
+}
+
+# strftime modifiers applied before formatting; weeks are labelled by their
+# Monday so a week spanning New Year stays a single bucket
+PERIOD_MODIFIERS = {
+    'week': ('weekday 0', '-6 days')
+}
+
+# Same bucketing as rollup_key, done in SQL for full rebuilds
+REBUILD_SQL = text(f"""
+    INSERT INTO walk_rollup (day, difficulty, condition, distance_bucket, duration_bucket,
+                             walks, total_distance, total_duration)
+    SELECT date(timestamp), coalesce(difficulty, ''), coalesce(condition, ''),
+           min(CAST(distance AS INTEGER), {MAX_DISTANCE_BUCKET}),
+           min(CAST(coalesce(duration, 0) / {DURATION_BUCKET_SECONDS} AS INTEGER), {MAX_DURATION_BUCKET}),
+           count(*), sum(distance), sum(coalesce(duration, 0))
+    FROM walk
+    WHERE timestamp IS NOT NULL
+    GROUP BY 1, 2, 3, 4, 5
+""")
+
+
+def rollup_key(walk):
+    return (
+        walk['timestamp'].date(),
+        walk.get('difficulty') or '',
+        walk.get('condition') or '',
+        min(int(walk['distance']), MAX_DISTANCE_BUCKET),
+        min(int((walk.get('duration') or 0) // DURATION_BUCKET_SECONDS), MAX_DURATION_BUCKET)
+    )
+
+
+def record_walks(walks):
+    """Add walk value dicts to the rollup table in the current transaction."""
+    groups = {}
+    for walk in walks:
+        if walk.get('timestamp') is None:
+            continue
+        totals = groups.setdefault(rollup_key(walk), [0, 0.0, 0.0])
+        totals[0] += 1
+        totals[1] += walk['distance']
+        totals[2] += walk.get('duration') or 0
+    if not groups:
+        return
+
+    rows = [dict(zip(('day', 'difficulty', 'condition', 'distance_bucket', 'duration_bucket'), key),
+                 walks=count, total_distance=distance, total_duration=duration)
+            for key, (count, distance, duration) in groups.items()]
+    stmt = insert(WalkRollup)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=['day', 'difficulty', 'condition', 'distance_bucket', 'duration_bucket'],
+        set_={
+            'walks': WalkRollup.walks + stmt.excluded.walks,
+            'total_distance': WalkRollup.total_distance + stmt.excluded.total_distance,
+            'total_duration': WalkRollup.total_duration + stmt.excluded.total_duration
+        }
+    ), rows)
+
+
+def rebuild_rollups():
+    db.session.query(WalkRollup).delete()
+    db.session.execute(REBUILD_SQL)
+    db.session.commit()
+
+
+def summarize(period='day', start_date=None, end_date=None):
+    query = db.session.query
+    filters = []
+    if start_date:
+        filters.append(WalkRollup.day >= datetime.strptime(start_date, "%Y-%m-%d").date())
+    if end_date:
+        filters.append(WalkRollup.day < (datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)).date())
+
+    walks = func.sum(WalkRollup.walks)
+    distance = func.sum(WalkRollup.total_distance)
+    duration = func.sum(WalkRollup.total_duration)
+
+    def totals(row):
+        count = row[0] or 0
+        return {
+            "walks": count,
+            "total_distance": row[1] or 0,
+            "total_duration": row[2] or 0,
+            "avg_distance": row[1] / count if count else None,
+            "avg_duration": row[2] / count if count else None
+        }
+
+    period_expr = func.strftime(PERIOD_FORMATS[period], WalkRollup.day, *PERIOD_MODIFIERS.get(period, ()))
+    buckets = (query(period_expr, walks, distance, duration)
+               .filter(*filters).group_by(period_expr).order_by(period_expr).all())
+
+    def distribution(column):
+        rows = query(column, walks).filter(*filters).group_by(column).order_by(column).all()
+        return {str(value) if value != '' else 'unknown': count for value, count in rows}
+
+    return {
+        "period": period,
+        "totals": totals(query(walks, distance, duration).filter(*filters).one()),
+        "buckets": [dict(totals(row[1:]), period=row[0]) for row in buckets],
+        "distributions": {
+            "difficulty": distribution(WalkRollup.difficulty),
+            "condition": distribution(WalkRollup.condition),
+            "distance_km": distribution(WalkRollup.distance_bucket),
+            "duration_15min": distribution(WalkRollup.duration_bucket)
+        }
+    }
@@ -0,0 +1,83 @@
+import json
+import numpy as np
+
+from geo import KM_PER_DEGREE, encode_geohashes
+from models import GEOHASH_PRECISION, Walk, db, encode_routes
+from routing import MAX_ROUTE_KM, MIN_ROUTE_KM, generate_routes, route_difficulty
+
+CONDITIONS = ['Clear', 'Clouds', 'Rain', 'Drizzle', 'Snow', 'Mist']
+CONDITION_WEIGHTS = [0.4, 0.3, 0.12, 0.08, 0.03, 0.07]
+PARKS = [json.dumps([]), json.dumps(['Dog park']), json.dumps(['Dog park', 'Pet shop'])]
+# Walks cluster around mornings and early evenings
+HOUR_WEIGHTS = np.array([0, 0, 0, 0, 0, 1, 4, 8, 9, 6, 4, 3, 4, 3, 3, 3, 4, 7, 9, 8, 5, 3, 1, 0], dtype=float)
+
+
+def synthetic_walks(count, areas, start, end, rng, route_points=11):
+    """Build column values for count random walks as numpy arrays.
+
+    Start points fall uniformly within one of the (lat, lon, radius_km)
+    areas and timestamps within [start, end).
+    """
+    area = np.asarray(areas, dtype=float)[rng.integers(len(areas), size=count)]
+    radius = area[:, 2] * np.sqrt(rng.random(count))
+    bearing = rng.uniform(0, 2 * np.pi, count)
+    lat = area[:, 0] + radius * np.cos(bearing) / KM_PER_DEGREE
+    lon = area[:, 1] + radius * np.sin(bearing) / (KM_PER_DEGREE * np.cos(np.radians(area[:, 0])))
+
+    distance = np.round(np.clip(rng.lognormal(np.log(2.5), 0.5, count), MIN_ROUTE_KM, MAX_ROUTE_KM), 2)
+    speed_kmh = rng.uniform(3.5, 5.5, count)
+    duration = np.round(distance / speed_kmh * 3600).astype(np.int64)
+
+    days = (end - start).days
+    day = rng.integers(max(days, 1), size=count)
+    seconds = rng.choice(24, size=count, p=HOUR_WEIGHTS / HOUR_WEIGHTS.sum()) * 3600 + rng.integers(3600, size=count)
+    timestamp = (np.datetime64(start, 's') + day.astype('timedelta64[D]') + seconds.astype('timedelta64[s]'))
+
+    day_of_year = (timestamp.astype('datetime64[D]') - timestamp.astype('datetime64[Y]')).astype(int)
+    temperature = np.round(13 - 9 * np.cos(2 * np.pi * (day_of_year - 15) / 365) + rng.normal(0, 3, count), 1)
+    condition = np.array(CONDITIONS)[rng.choice(len(CONDITIONS), size=count, p=CONDITION_WEIGHTS)]
+    difficulty = route_difficulty(distance)
+    parks = np.array(PARKS)[rng.integers(len(PARKS), size=count)]
+    routes = generate_routes(lat, lon, distance, steps=route_points - 1, rng=rng)
+
+    return {
+        'lat': lat,
+        'lon': lon,
+        'distance': distance,
+        'duration': duration,
+        'timestamp': timestamp,
+        'temperature': temperature,
+        'condition': condition,
+        'dog_parks_visited': parks,
+        'difficulty': difficulty,
+        'route': routes
+    }
+
+
+def insert_synthetic_walks(count, areas, start, end, seed=0, batch_size=10000, route_points=11, progress=None):
+    """Bulk insert count synthetic walks; the same seed gives the same rows.
+
+    Rows go straight to SQLite with executemany in batches of batch_size.
+    """
+    rng = np.random.default_rng(seed)
+    inserted = 0
+    while inserted < count:
+        size = min(batch_size, count - inserted)
+        walks = synthetic_walks(size, areas, start, end, rng, route_points)
+        columns = {key: values.tolist() for key, values in walks.items() if key not in ('timestamp', 'route')}
+        # Same text format SQLAlchemy's SQLite DateTime writes
+        columns['timestamp'] = np.char.replace(
+            np.datetime_as_string(walks['timestamp'], unit='us'), 'T', ' ').tolist()
+        columns['route'] = encode_routes(walks['route'])
+        columns['geohash'] = encode_geohashes(walks['lat'], walks['lon'], GEOHASH_PRECISION)
+        # A plain DBAPI executemany: no ORM objects, listeners or per-row
+        # parameter processing
+        sql = (f"INSERT INTO {Walk.__tablename__} ({', '.join(columns)}) "
+               f"VALUES ({', '.join('?' * len(columns))})")
+        db.session.connection().exec_driver_sql(sql, list(zip(*columns.values())))
+        db.session.commit()
+        inserted += size
+        if progress:
+            progress(inserted)
+    return inserted
+
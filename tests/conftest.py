@@ -0,0 +1,55 @@
+import os
+import shutil
+import tempfile
+
+import pytest
+
+# Test modules import the app at collection time, before any fixture runs, so
+# point it at a throwaway database here; the suite never touches the tracked
+# instance/dog_walks.sqlite3
+DATABASE_DIR = tempfile.mkdtemp(prefix='dog-walks-tests-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(DATABASE_DIR, 'dog_walks.sqlite3')}"
+
+from app import app, breakers, db, spot_service, weather_service  # noqa: E402
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(DATABASE_DIR, ignore_errors=True)
+
+
+@pytest.fixture(scope='session', autouse=True)
+def create_tables():
+    # The app no longer creates tables on import; see `flask init-db`
+    with app.app_context():
+        db.create_all()
+
+
+@pytest.fixture(autouse=True)
+def empty_tables():
+    # Every test starts from empty tables, whatever the previous one wrote
+    yield
+    with app.app_context():
+        db.session.remove()
+        for table in reversed(db.metadata.sorted_tables):
+            db.session.execute(table.delete())
+        db.session.commit()
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    spot_service.cache.clear()
+    spot_service.flight.reset()
+    weather_service.cache.clear()
+    weather_service.flight.reset()
+    for breaker in breakers.values():
+        breaker.reset()
+    yield
+    spot_service.cache.clear()
+    weather_service.cache.clear()
@@ -1,18 +1,17 @@
+import csv
+import io
+import json
+import time
+
 import pytest
-from app import app, db
+from app import app, breakers, db, encode_route, weather_service
 from unittest.mock import patch, Mock, MagicMock
 from datetime import datetime, timedelta
 
 from models import Walk
 
-@pytest.fixture
-def client():
-    app.config['TESTING'] = True
-    with app.test_client() as client:
-        yield client
-
-@patch('app.requests.get')   # For weather API
-@patch('app.requests.post')  # For route API
+@patch('app.upstream.get')   # For weather API
+@patch('app.upstream.post')  # For route API
 def test_generate_route_success(mock_post, mock_get, client):
     # Mock the OpenRouteService route response to simulate multiple routes
     mock_post.return_value = MagicMock(status_code=200)
@@ -77,7 +76,7 @@ def test_dog_spots_missing_params(client):
     data = response.get_json()
     assert 'error' in data
 
-@patch('app.requests.get')
+@patch('app.upstream.get')
 def test_weather_success(mock_get, client):
     # Mock JSON response data for weather API
     mock_response = Mock()
@@ -107,7 +106,7 @@ def test_weather_missing_params(client):
     
 
 
-@patch('app.requests.post')
+@patch('app.upstream.post')
 def test_dog_spots_api_failure(mock_post, client):
     # Simulate failure in Overpass API call
     mock_post.side_effect = Exception("API failure")
@@ -121,7 +120,7 @@ def test_dog_spots_api_failure(mock_post, client):
     data = response.get_json()
     assert 'error' in data
 
-@patch('app.requests.get')
+@patch('app.upstream.get')
 def test_weather_api_failure(mock_get, client):
     # Simulate failure in OpenWeather API call
     mock_get.side_effect = Exception("API failure")
@@ -169,8 +168,8 @@ def test_api_walks_pagination(client):
     assert 'walks' in data
     assert 'page' in data
 
-@patch('app.requests.get')
-@patch('app.requests.post')
+@patch('app.upstream.get')
+@patch('app.upstream.post')
 def test_generate_route_with_duration(mock_post, mock_get, client):
     mock_post.return_value = MagicMock(status_code=200)
     mock_post.return_value.json.return_value = {
@@ -200,3 +199,350 @@ def test_generate_route_with_duration(mock_post, mock_get, client):
     assert data["duration"] == int(45.5 * 60)  # expected in seconds
     
 
+
+@patch('app.get_dog_friendly_spots')
+@patch('app.upstream.get')
+def test_generate_route_slow_spots_does_not_block_weather(mock_get, mock_spots, client):
+    mock_get.return_value = MagicMock(status_code=200)
+    mock_get.return_value.json.return_value = {
+        "main": {"temp": 20},
+        "weather": [{"main": "Clear", "description": "clear sky"}]
+    }
+    mock_spots.side_effect = lambda *args, **kwargs: time.sleep(1) or []
+
+    old_deadline = app.config['SPOTS_DEADLINE_SECONDS']
+    app.config['SPOTS_DEADLINE_SECONDS'] = 0.1
+    try:
+        started = time.monotonic()
+        response = client.post('/generate-route', json={
+            'lat': 37.7749,
+            'lon': -122.4194,
+            'distance': 3
+        })
+        elapsed = time.monotonic() - started
+    finally:
+        app.config['SPOTS_DEADLINE_SECONDS'] = old_deadline
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert elapsed < 1
+    assert data["weather"]["temperature"] == 20
+    assert data["dog_parks"] == []
+    assert data["unavailable"] == ["dog_spots"]
+
+@patch('app.upstream.post')
+def test_dog_spots_served_from_cache_for_nearby_request(mock_post, client):
+    mock_post.return_value = MagicMock(status_code=200)
+    mock_post.return_value.json.return_value = {
+        "elements": [
+            {"lat": 37.775, "lon": -122.4195, "tags": {"leisure": "dog_park", "name": "Duboce"}}
+        ]
+    }
+
+    first = client.post('/dog-spots', json={'lat': 37.7749, 'lon': -122.4194})
+    second = client.post('/dog-spots', json={'lat': 37.77495, 'lon': -122.41945})
+
+    assert first.status_code == 200
+    assert second.get_json() == first.get_json()
+    assert mock_post.call_count == 1
+
+    stats = client.get('/api/cache-stats').get_json()['dog_spots']
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+
+@patch('app.upstream.get')
+def test_weather_served_stale_when_upstream_breaker_opens(mock_get, client):
+    mock_get.return_value = MagicMock(status_code=200)
+    mock_get.return_value.json.return_value = {
+        "main": {"temp": 18},
+        "weather": [{"main": "Clouds", "description": "few clouds", "icon": "02d"}]
+    }
+    assert client.post('/weather', json={'lat': 37.7749, 'lon': -122.4194}).status_code == 200
+
+    # Let the cached reading expire and the upstream go down
+    with patch.object(weather_service.cache, 'clock', return_value=time.monotonic() + 700):
+        mock_get.side_effect = ConnectionError("down")
+        for failures in range(1, app.config['BREAKER_FAILURE_THRESHOLD'] + 1):
+            response = client.post('/weather', json={'lat': 37.7749, 'lon': -122.4194})
+            assert response.status_code == 200
+            assert response.get_json()['temperature'] == 18
+            # Wait for the background refresh to fail
+            deadline = time.monotonic() + 5
+            while breakers['openweather'].failures < failures and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert breakers['openweather'].failures >= failures
+
+    health = client.get('/health').get_json()
+    assert health['status'] == 'degraded'
+    assert health['upstreams']['openweather']['state'] == 'open'
+    assert health['upstreams']['overpass']['state'] == 'closed'
+
+    # Uncached locations fail fast without calling the upstream
+    calls = mock_get.call_count
+    response = client.post('/weather', json={'lat': 51.5, 'lon': -0.12})
+    assert response.status_code == 500
+    assert mock_get.call_count == calls
+
+def test_health_reports_ok_when_breakers_closed(client):
+    health = client.get('/health').get_json()
+    assert health['status'] == 'ok'
+    assert set(health['upstreams']) == {'openweather', 'overpass'}
+
+@patch('app.upstream.get')
+def test_weather_cache_shared_by_weather_and_generate_route(mock_get, client):
+    mock_get.return_value = MagicMock(status_code=200)
+    mock_get.return_value.json.return_value = {
+        "main": {"temp": 18},
+        "weather": [{"main": "Clouds", "description": "few clouds", "icon": "02d"}]
+    }
+
+    weather = client.post('/weather', json={'lat': 37.7749, 'lon': -122.4194})
+    route = client.post('/generate-route', json={
+        'lat': 37.7752,
+        'lon': -122.4190,
+        'distance': 2
+    })
+
+    assert weather.status_code == 200
+    assert route.get_json()["weather"] == {
+        "temperature": 18,
+        "condition": "Clouds",
+        "description": "few clouds"
+    }
+    assert mock_get.call_count == 1
+
+@patch('app.upstream.get')
+@patch('app.upstream.post')
+def test_generate_route_loop_returns_to_start(mock_post, mock_get, client):
+    mock_post.return_value = MagicMock(status_code=200)
+    mock_post.return_value.json.return_value = {"elements": []}
+    mock_get.side_effect = Exception("weather down")
+
+    response = client.post('/generate-route', json={
+        'lat': 37.7749,
+        'lon': -122.4194,
+        'distance': 3,
+        'route_type': 'loop'
+    })
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["route_type"] == "loop"
+    for route in data["routes"]:
+        assert route[0] == pytest.approx([37.7749, -122.4194])
+        assert route[-1] == pytest.approx([37.7749, -122.4194])
+
+
+def test_generate_route_rejects_unknown_route_type(client):
+    response = client.post('/generate-route', json={
+        'lat': 37.7749,
+        'lon': -122.4194,
+        'distance': 3,
+        'route_type': 'zigzag'
+    })
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+@patch('app.upstream.get')
+@patch('app.upstream.post')
+def test_generate_route_scores_routes_by_spots_passed(mock_post, mock_get, client):
+    mock_post.return_value = MagicMock(status_code=200)
+    mock_post.return_value.json.return_value = {
+        "elements": [
+            {"lat": 37.7749, "lon": -122.4194, "tags": {"leisure": "dog_park", "name": "Start Park"}},
+            {"lat": 10.0, "lon": 10.0, "tags": {"amenity": "drinking_water"}}
+        ]
+    }
+    mock_get.side_effect = Exception("weather down")
+
+    response = client.post('/generate-route', json={
+        'lat': 37.7749,
+        'lon': -122.4194,
+        'distance': 3
+    })
+
+    data = response.get_json()
+    assert len(data["routes"]) == len(data["route_details"]) == 3
+    for details in data["route_details"]:
+        assert details["score"] == 3.0
+        assert [spot["name"] for spot in details["spots"]] == ["Start Park"]
+
+def test_api_walks_keyset_pagination(client):
+    base = datetime(2024, 5, 1, 8, 0)
+    with app.app_context():
+        walks = [Walk(lat=37.7749, lon=-122.4194, distance=900 + i, duration=600,
+                      timestamp=base + timedelta(minutes=i // 2))
+                 for i in range(7)]
+        db.session.add_all(walks)
+        db.session.commit()
+        expected_ids = [w.id for w in sorted(walks, key=lambda w: (w.timestamp, w.id), reverse=True)]
+
+    seen = []
+    response = client.get('/api/walks?cursor=&per_page=3&min_distance=900&include_total=1')
+    data = response.get_json()
+    assert data['total'] == 7
+    while True:
+        seen.extend(w['id'] for w in data['walks'])
+        if not data['next_cursor']:
+            break
+        response = client.get(f"/api/walks?cursor={data['next_cursor']}&per_page=3&min_distance=900")
+        data = response.get_json()
+        assert 'total' not in data
+
+    assert seen == expected_ids
+
+
+def test_api_walks_rejects_invalid_cursor(client):
+    response = client.get('/api/walks?cursor=not-a-cursor')
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+def test_api_walks_clamps_per_page(client):
+    for per_page, expected in ((0, 1), (-1, 1), (10000, app.config['WALKS_MAX_PER_PAGE'])):
+        response = client.get(f'/api/walks?cursor=&per_page={per_page}')
+        assert response.status_code == 200
+        assert response.get_json()['per_page'] == expected
+
+def test_export_walks_streams_ndjson_and_csv(client):
+    with app.app_context():
+        db.session.add_all([
+            Walk(lat=37.7749, lon=-122.4194, distance=800 + i, duration=600,
+                 timestamp=datetime(2024, 6, 1 + i), difficulty='easy',
+                 route=encode_route([[37.7749, -122.4194], [37.775, -122.42]]))
+            for i in range(3)
+        ])
+        db.session.commit()
+
+    response = client.get('/api/walks/export?min_distance=800&max_distance=801&include_route=1')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [r['distance'] for r in records] == [801, 800]
+    assert records[0]['route'] == [[37.7749, -122.4194], [37.775, -122.42]]
+
+    response = client.get('/api/walks/export?format=csv&min_distance=800&start_date=2024-06-03')
+    assert response.mimetype == 'text/csv'
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+    assert rows[0][:4] == ['id', 'lat', 'lon', 'distance']
+    assert 'route' not in rows[0]
+    assert [row[3] for row in rows[1:]] == ['802.0']
+
+
+def test_export_walks_rejects_unknown_format(client):
+    response = client.get('/api/walks/export?format=xml')
+    assert response.status_code == 400
+
+
+def test_walk_listing_and_export_reject_bad_dates(client):
+    for url in ('/api/walks/export?start_date=bad', '/api/walks?end_date=2024-13-01',
+                '/api/walks?cursor=&start_date=yesterday'):
+        response = client.get(url)
+        assert response.status_code == 400
+        assert response.get_json() == {'error': 'Dates must be YYYY-MM-DD'}
+
+def test_bulk_save_walks_reports_row_errors(client):
+    app.config['BULK_INSERT_BATCH_SIZE'] = 2
+    walks = [
+        {'lat': 37.77, 'lon': -122.41, 'distance': 700, 'duration': 1200,
+         'timestamp': '2024-03-01T08:30:00', 'route': [[37.77, -122.41], [37.771, -122.411]]},
+        {'lat': 37.77, 'lon': -122.41, 'duration': 1200},
+        {'lat': 'north', 'lon': -122.41, 'distance': 701, 'duration': 1200},
+        {'lat': 37.78, 'lon': -122.42, 'distance': 702, 'duration': 900},
+        {'lat': 37.79, 'lon': -122.43, 'distance': 703, 'duration': 600},
+    ]
+    try:
+        response = client.post('/api/walks/bulk', json=walks)
+        assert response.status_code == 201
+        data = response.get_json()
+        assert data['inserted'] == 3
+        assert [e['index'] for e in data['errors']] == [1, 2]
+        assert "Missing field 'distance'" in data['errors'][0]['error']
+
+        with app.app_context():
+            saved = Walk.query.filter(Walk.distance >= 700).order_by(Walk.distance).all()
+            assert [w.distance for w in saved] == [700, 702, 703]
+            assert saved[0].timestamp == datetime(2024, 3, 1, 8, 30)
+            assert saved[0].route_coordinates == [(37.77, -122.41), (37.771, -122.411)]
+    finally:
+        app.config['BULK_INSERT_BATCH_SIZE'] = 500
+
+
+def test_bulk_save_walks_accepts_ndjson(client):
+    body = '\n'.join(json.dumps({'lat': 51.5, 'lon': -0.12, 'distance': 600 + i, 'duration': 300})
+                     for i in range(3)) + '\n'
+    response = client.post('/api/walks/bulk', data=body, content_type='application/x-ndjson')
+    assert response.status_code == 201
+    assert response.get_json() == {'inserted': 3, 'errors': []}
+
+
+def test_bulk_save_walks_reports_only_bad_rows_in_a_batch(client):
+    walk = {'lat': 51.5, 'lon': -0.12, 'duration': 300}
+    walks = [dict(walk, distance=850), dict(walk, distance=851), dict(walk, distance=852, condition={'a': 1}),
+             dict(walk, distance=853), dict(walk, distance=854, dog_parks_visited='Dog park')]
+    response = client.post('/api/walks/bulk', json=walks)
+    assert response.status_code == 201
+    data = response.get_json()
+    assert data['inserted'] == 3
+    assert data['errors'] == [{'index': 2, 'error': 'Invalid value: condition must be a string'},
+                              {'index': 4, 'error': 'Invalid value: dog_parks_visited must be a list'}]
+
+
+def test_bulk_save_walks_retries_failed_batch_row_by_row(client):
+    def record_walks(rows):
+        if any(row['distance'] == 862 for row in rows):
+            raise ValueError('cannot bind')
+    walks = [{'lat': 51.5, 'lon': -0.12, 'distance': 860 + i, 'duration': 300} for i in range(4)]
+    with patch('app.record_walks', side_effect=record_walks):
+        response = client.post('/api/walks/bulk', json=walks)
+    data = response.get_json()
+    assert data == {'inserted': 3, 'errors': [{'index': 2, 'error': 'Database error'}]}
+    with app.app_context():
+        assert Walk.query.filter(Walk.distance.between(860, 863)).count() == 3
+
+
+def test_bulk_save_walks_validates_timestamps(client):
+    walks = [
+        {'lat': 51.5, 'lon': -0.12, 'distance': 800, 'duration': 300, 'timestamp': 12345},
+        {'lat': 51.5, 'lon': -0.12, 'distance': 801, 'duration': 300, 'timestamp': 'yesterday'},
+        {'lat': 51.5, 'lon': -0.12, 'distance': 802, 'duration': 300,
+         'timestamp': '2024-03-01T10:30:00+02:00'},
+    ]
+    response = client.post('/api/walks/bulk', json=walks)
+    assert response.status_code == 201
+    data = response.get_json()
+    assert data['inserted'] == 1
+    assert [e['index'] for e in data['errors']] == [0, 1]
+
+    with app.app_context():
+        saved = Walk.query.filter_by(distance=802).one()
+        assert saved.timestamp == datetime(2024, 3, 1, 8, 30)
+
+
+def test_bulk_save_walks_rejects_non_array(client):
+    response = client.post('/api/walks/bulk', json={'lat': 1})
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+def test_nearby_walks_by_radius_and_bbox(client):
+    with app.app_context():
+        db.session.add_all([
+            Walk(lat=-33.8568, lon=151.2153, distance=500, duration=60),   # Opera House
+            Walk(lat=-33.8523, lon=151.2108, distance=501, duration=60),   # ~0.7 km away
+            Walk(lat=-33.8915, lon=151.2767, distance=502, duration=60),   # Bondi, ~6.7 km
+        ])
+        db.session.commit()
+
+    response = client.get('/api/walks/nearby?lat=-33.8568&lon=151.2153&radius_km=1')
+    assert response.status_code == 200
+    walks = response.get_json()['walks']
+    assert [w['distance'] for w in walks] == [500, 501]
+    assert walks[0]['distance_from_km'] == 0
+    assert 0.5 < walks[1]['distance_from_km'] < 1
+
+    response = client.get('/api/walks/nearby?min_lat=-33.9&min_lon=151.25&max_lat=-33.88&max_lon=151.3')
+    assert [w['distance'] for w in response.get_json()['walks']] == [502]
+
+
+def test_nearby_walks_requires_location(client):
+    assert client.get('/api/walks/nearby').status_code == 400
+    assert client.get('/api/walks/nearby?lat=1&lon=1&radius_km=500').status_code == 400
@@ -10,7 +10,7 @@ class DogWalkingAppTests(unittest.TestCase):
         self.app = app.test_client()
         self.app.testing = True
 
-    @patch("app.requests.post")
+    @patch("app.upstream.post")
     def test_create_route_coordinates_function(self, mock_post):
         # Setup mock response data structure similar to ORS response
         mock_response = Mock()
@@ -40,7 +40,7 @@ class DogWalkingAppTests(unittest.TestCase):
         self.assertIsInstance(route[0], tuple)
         self.assertEqual(len(route[0]), 2)
 
-    @patch("app.requests.post")
+    @patch("app.upstream.post")
     def test_generate_route_endpoint_success(self, mock_post):
         mock_response = Mock()
         mock_response.status_code = 200
@@ -85,7 +85,7 @@ class DogWalkingAppTests(unittest.TestCase):
         response_data = json.loads(response.data)
         self.assertIn("error", response_data)
         
-    @patch("app.requests.post")
+    @patch("app.upstream.post")
     def test_dog_spots_endpoint_success(self, mock_post):
         mock_response = Mock()
         mock_response.status_code = 200
@@ -121,7 +121,7 @@ class DogWalkingAppTests(unittest.TestCase):
         self.assertIn('error', data)
         
         
-    @patch('app.requests.get')
+    @patch('app.upstream.get')
     def test_weather_endpoint_success(self, mock_get):
         mock_response = Mock()
         mock_response.status_code = 200
@@ -0,0 +1,49 @@
+import requests
+
+from benchmarks.fake_upstreams import FakeUpstream
+from benchmarks.report import compare, print_table, summarize
+from spots import SPOT_TAGS, overpass_query
+
+
+def test_summarize_reports_percentiles_and_throughput():
+    summary = summarize([i / 1000 for i in range(1, 101)], elapsed=2.0, errors=3)
+
+    assert summary['requests'] == 100
+    assert summary['errors'] == 3
+    assert summary['rps'] == 50.0
+    assert summary['p50_ms'] == 50.5
+    assert summary['p99_ms'] == 99.01
+
+
+def test_compare_flags_slower_latency_and_lower_throughput():
+    baseline = {'results': {'weather': {'p95_ms': 100, 'rps': 200}, 'decode_route': {'mean_us': 10}}}
+    current = {'results': {'weather': {'p95_ms': 105, 'rps': 150}, 'decode_route': {'mean_us': 20}}}
+
+    flagged = {(name, metric) for name, metric, *_ in compare(baseline, current, threshold=0.1)}
+    assert flagged == {('weather', 'rps'), ('decode_route', 'mean_us')}
+
+
+def test_fake_upstream_serves_weather_spots_and_injected_errors():
+    upstream = FakeUpstream(spots=5).start()
+    try:
+        weather = requests.get(f"{upstream.url}/data/2.5/weather?lat=37.7&lon=-122.4").json()
+        assert weather['weather'][0]['main'] == 'Clouds'
+
+        query = overpass_query(37.7, -122.4, 1000, SPOT_TAGS)
+        elements = requests.post(f"{upstream.url}/api/interpreter", data={'data': query}).json()['elements']
+        assert len(elements) == 5
+        assert all(abs(el['lat'] - 37.7) < 0.01 for el in elements)
+
+        upstream.error_rate = 1.0
+        assert requests.get(f"{upstream.url}/data/2.5/weather?lat=0&lon=0").status_code == 503
+        assert upstream.requests == 3
+    finally:
+        upstream.stop()
+
+
+def test_print_table_keeps_long_column_names_apart(capsys):
+    print_table({'encode_routes': {'calls': 100, 'encoded_bytes': 123456}})
+
+    header, row = capsys.readouterr().out.splitlines()
+    assert header.split() == ['calls', 'encoded_bytes']
+    assert row.split() == ['encode_routes', '100', '123456']
@@ -0,0 +1,138 @@
+import threading
+import time
+
+import pytest
+
+from concurrent.futures import ThreadPoolExecutor
+
+from cache import SingleFlight, TTLCache, cell_center, grid_cell, stale_while_revalidate
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_cache_hit_and_miss():
+    cache = TTLCache(ttl=60, maxsize=10)
+    assert cache.get('a') is None
+    cache.set('a', [1, 2])
+    assert cache.get('a') == [1, 2]
+
+    stats = cache.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+
+
+def test_cache_entries_expire():
+    clock = FakeClock()
+    cache = TTLCache(ttl=60, maxsize=10, clock=clock)
+    cache.set('a', 1)
+    clock.now = 59
+    assert cache.get('a') == 1
+    clock.now = 61
+    assert cache.get('a') is None
+    assert cache.stats()['expirations'] == 1
+    assert len(cache) == 0
+
+
+def test_cache_evicts_least_recently_used():
+    cache = TTLCache(ttl=60, maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert cache.stats()['evictions'] == 1
+
+
+def test_grid_cell_groups_nearby_points():
+    cell = grid_cell(37.77491, -122.41941, 0.005)
+    assert cell == grid_cell(37.77452, -122.41988, 0.005)
+    assert cell != grid_cell(37.7801, -122.41941, 0.005)
+
+    center_lat, center_lon = cell_center(cell, 0.005)
+    assert abs(center_lat - 37.7749) < 0.005
+    assert abs(center_lon - -122.4194) < 0.005
+
+
+def test_single_flight_shares_one_call_between_concurrent_callers():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        release.wait(timeout=5)
+        return ['spot']
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do('cell', fetch)))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while flight.coalesced < 4 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [['spot']] * 5
+
+
+def test_single_flight_propagates_errors_and_forgets_key():
+    flight = SingleFlight()
+
+    def fail():
+        raise ValueError("upstream down")
+
+    with pytest.raises(ValueError):
+        flight.do('cell', fail)
+    assert flight.do('cell', lambda: 'ok') == 'ok'
+
+
+def test_cache_serves_stale_entries_within_stale_ttl():
+    clock = FakeClock()
+    cache = TTLCache(ttl=60, maxsize=10, stale_ttl=300, clock=clock)
+    cache.set('a', 1)
+
+    clock.now = 61
+    assert cache.lookup('a') == (1, False)
+    assert cache.get('a') is None
+
+    clock.now = 361
+    assert cache.lookup('a') == (None, False)
+    assert cache.stats()['stale_hits'] == 2
+    assert cache.stats()['expirations'] == 1
+
+
+def test_stale_while_revalidate_starts_one_background_refresh():
+    clock = FakeClock()
+    cache = TTLCache(ttl=60, maxsize=10, stale_ttl=300, clock=clock)
+    flight = SingleFlight()
+    cache.set('cell', 'old')
+    clock.now = 61
+    release = threading.Event()
+    calls = []
+
+    def refresh(key):
+        calls.append(key)
+        release.wait(timeout=5)
+        cache.set(key, 'new')
+        return 'new'
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        assert stale_while_revalidate(cache, flight, 'cell', refresh, executor) == 'old'
+        assert stale_while_revalidate(cache, flight, 'cell', refresh, executor) == 'old'
+        release.set()
+
+    assert calls == ['cell']
+    assert stale_while_revalidate(cache, flight, 'cell', refresh, executor) == 'new'
@@ -0,0 +1,31 @@
+import random
+
+from geo import encode_geohash, geohash_cell_size, geohash_cells, haversine_km, radius_bbox
+
+
+def test_encode_geohash_known_value():
+    assert encode_geohash(42.605, -5.603, 5) == 'ezs42'
+    assert encode_geohash(37.7749, -122.4194, 9).startswith('9q8yy')
+
+
+def test_geohash_cell_size():
+    lat_size, lon_size = geohash_cell_size(5)
+    assert round(lat_size, 6) == round(180 / 2 ** 12, 6)
+    assert round(lon_size, 6) == round(360 / 2 ** 13, 6)
+
+
+def test_geohash_cells_cover_every_point_in_box():
+    rng = random.Random(11)
+    bbox = radius_bbox(37.7749, -122.4194, 2.0)
+    cells = geohash_cells(*bbox, max_cells=16)
+    assert len(cells) <= 16
+    for _ in range(2000):
+        lat = rng.uniform(bbox[0], bbox[2])
+        lon = rng.uniform(bbox[1], bbox[3])
+        point_hash = encode_geohash(lat, lon, 9)
+        assert any(point_hash.startswith(cell) for cell in cells)
+
+
+def test_haversine_km():
+    distances = haversine_km(51.5007, -0.1246, [40.6892], [-74.0445])
+    assert abs(distances[0] - 5574.8) < 5
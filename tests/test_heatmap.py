@@ -0,0 +1,67 @@
+import json
+
+import numpy as np
+
+from app import app, db
+from heatmap import bin_points, walk_points
+from models import HeatmapBin, HeatmapPending, HeatmapTile, Walk, encode_route
+
+
+def test_walk_points_resamples_route():
+    route = encode_route([[0.0, 0.0], [0.0, 0.009]])  # ~1 km east
+    points = walk_points({'lat': 0.0, 'lon': 0.0, 'route': route}, 0.1)
+    assert len(points) == 11
+    assert np.allclose(points[-1], (0.0, 0.009))
+
+
+def test_walk_points_falls_back_to_start():
+    points = walk_points({'lat': 1.5, 'lon': 2.5, 'route': None}, 0.1)
+    assert points.tolist() == [[1.5, 2.5]]
+
+
+def test_bin_points_matches_slippy_tile_numbers():
+    # Tower Bridge is in OSM tile 16/32754/21792
+    keys, weights = bin_points(np.array([[51.5055, -0.0754]] * 3), [16], 64)
+    (zoom, x, y, bx, by), = keys.tolist()
+    assert (zoom, x, y) == (16, 32754, 21792)
+    assert 0 <= bx < 64 and 0 <= by < 64
+    assert weights.tolist() == [3]
+
+
+def test_bin_points_aggregates_per_zoom():
+    points = np.array([[51.5055, -0.0754], [51.5055, -0.0754], [51.52, -0.05]])
+    keys, weights = bin_points(points, [10, 16], 64)
+    assert sorted(keys[:, 0].tolist()) == [10, 10, 16, 16]
+    assert weights[keys[:, 0] == 10].sum() == 3
+    assert weights[keys[:, 0] == 16].sum() == 3
+
+
+def test_saved_walks_build_tiles_served_with_etags(client):
+    route = [[51.5055, -0.0754], [51.5060, -0.0740], [51.5070, -0.0730]]
+    client.post('/save-walk', json={'lat': 51.5055, 'lon': -0.0754, 'distance': 400,
+                                    'duration': 600, 'route': route})
+
+    # Saving only queues the walk; the heatmap job bins it
+    with app.app_context():
+        walk = Walk.query.filter_by(distance=400).one()
+        assert db.session.get(HeatmapPending, walk.id)
+        assert HeatmapBin.query.filter_by(zoom=16, tile_x=32754, tile_y=21792).count() == 0
+    assert client.get('/heatmap/16/32754/21792.json').status_code == 204
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=['build-heatmap'])
+    assert 'Binned' in result.output
+    assert 'Rendered' in result.output
+
+    response = client.get('/heatmap/16/32754/21792.json')
+    assert response.status_code == 200
+    tile = json.loads(response.data)
+    assert tile['z'] == 16 and tile['bins'] == 64
+    assert tile['max'] > 0 and tile['cells']
+
+    etag = response.headers['ETag']
+    cached = client.get('/heatmap/16/32754/21792.json', headers={'If-None-Match': etag})
+    assert cached.status_code == 304
+
+    with app.app_context():
+        assert HeatmapTile.query.filter_by(stale=True).count() == 0
+        assert HeatmapPending.query.count() == 0
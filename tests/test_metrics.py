@@ -0,0 +1,104 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app import app, db, metrics
+from metrics import Histogram
+from upstream import UpstreamClient
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    metrics.enabled = metrics.server_timing = True
+    metrics.clear()
+    with app.test_client() as client:
+        yield client
+    metrics.enabled = metrics.server_timing = False
+    metrics.clear()
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram('demo_seconds', 'Demo.', ('path',), buckets=(0.1, 1.0))
+    histogram.observe(0.05, '/a')
+    histogram.observe(0.5, '/a')
+    histogram.observe(3, '/a')
+
+    lines = histogram.render().splitlines()
+    assert lines[:2] == ['# HELP demo_seconds Demo.', '# TYPE demo_seconds histogram']
+    assert 'demo_seconds_bucket{path="/a",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{path="/a",le="1.0"} 2' in lines
+    assert 'demo_seconds_bucket{path="/a",le="+Inf"} 3' in lines
+    assert 'demo_seconds_sum{path="/a"} 3.55' in lines
+    assert 'demo_seconds_count{path="/a"} 3' in lines
+
+
+@patch('app.upstream.get')
+@patch('app.upstream.post')
+def test_generate_route_reports_stage_timings(mock_post, mock_get, client):
+    mock_post.return_value = MagicMock(status_code=200)
+    mock_post.return_value.json.return_value = {"elements": []}
+    mock_get.return_value = MagicMock(status_code=200)
+    mock_get.return_value.json.return_value = {
+        "main": {"temp": 18},
+        "weather": [{"main": "Clear", "description": "clear sky", "icon": "01d"}]
+    }
+
+    response = client.post('/generate-route', json={'lat': 37.7749, 'lon': -122.4194, 'distance': 2})
+
+    assert response.status_code == 200
+    stages = [part.split(';')[0] for part in response.headers['Server-Timing'].split(', ')]
+    assert stages == ['routes', 'weather', 'spots', 'scoring', 'serialize', 'db', 'total']
+
+    text = client.get('/metrics').get_data(as_text=True)
+    assert 'http_request_duration_seconds_count{endpoint="generate_route",method="POST",status="200"} 1' in text
+    assert 'app_span_duration_seconds_count{span="scoring"} 1' in text
+
+
+def test_database_queries_are_counted_per_request(client):
+    response = client.get('/api/walks?per_page=5')
+
+    assert 'desc="2 queries"' in response.headers['Server-Timing']
+    text = client.get('/metrics').get_data(as_text=True)
+    assert 'db_queries_per_request_sum{endpoint="api_walks"} 2' in text
+    assert 'db_query_duration_seconds_count 2' in text
+
+
+def test_failed_statement_leaves_no_stale_timing(client):
+    with app.app_context():
+        with db.engine.connect() as conn:
+            info = {key: list(value) for key, value in conn.info.items() if isinstance(value, list)}
+            with pytest.raises(Exception):
+                conn.execute(db.text("SELECT * FROM no_such_table"))
+            conn.rollback()
+            conn.execute(db.text("SELECT 1"))
+            assert {key: value for key, value in conn.info.items() if isinstance(value, list)} == info
+
+    text = client.get('/metrics').get_data(as_text=True)
+    assert 'db_query_duration_seconds_count 1' in text
+
+
+def test_upstream_calls_are_observed():
+    observed = []
+    upstream = UpstreamClient(connect_timeout=1, read_timeout=1, retries=0, backoff_factor=0, pool_size=1)
+    upstream.observer = lambda *args: observed.append(args)
+    with patch.object(upstream.session, 'request', return_value=MagicMock(status_code=503)):
+        upstream.get('https://api.openweathermap.org/data/2.5/weather')
+    with patch.object(upstream.session, 'request', side_effect=ConnectionError):
+        with pytest.raises(ConnectionError):
+            upstream.post('http://overpass-api.de/api/interpreter')
+
+    assert [args[:3] for args in observed] == [
+        ('GET', 'https://api.openweathermap.org/data/2.5/weather', 503),
+        ('POST', 'http://overpass-api.de/api/interpreter', 'error')
+    ]
+
+
+def test_disabled_metrics_add_nothing(client):
+    metrics.enabled = False
+
+    response = client.get('/api/walks?per_page=5')
+
+    assert 'Server-Timing' not in response.headers
+    assert client.get('/metrics').status_code == 404
+    assert metrics.span('routes') is metrics.span('scoring')
@@ -0,0 +1,67 @@
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+
+from sqlalchemy import create_engine
+
+from models import db
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAD = 'd81f4a6b2c59'
+
+
+def flask(path, *args):
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{path}")
+    return subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', *args],
+                          cwd=ROOT, env=env, capture_output=True, text=True, timeout=120)
+
+
+def version(path):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT version_num FROM alembic_version").fetchone()[0]
+
+
+def tables(path):
+    with sqlite3.connect(path) as conn:
+        return {name for name, in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+
+def test_shipped_database_upgrades_to_head(tmp_path):
+    path = tmp_path / 'dog_walks.sqlite3'
+    shutil.copy(os.path.join(ROOT, 'instance', 'dog_walks.sqlite3'), path)
+    # Only stamped, with no walk table, so b41f9c2e6d10 has to create it
+    assert tables(path) == {'alembic_version'}
+    assert version(path) == '7aeb0c5eeb9a'
+
+    result = flask(path, 'db', 'upgrade')
+    assert result.returncode == 0, result.stderr
+    assert version(path) == HEAD
+    assert {'walk', 'walk_rollup', 'heatmap_bin', 'heatmap_tile', 'heatmap_pending', 'spot'} <= tables(path)
+
+
+def test_database_from_create_all_upgrades_to_head(tmp_path):
+    # Databases the app used to create on import already have every table and index
+    path = tmp_path / 'dog_walks.sqlite3'
+    engine = create_engine(f"sqlite:///{path}")
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE alembic_version (version_num VARCHAR(32) PRIMARY KEY)")
+        conn.exec_driver_sql("INSERT INTO alembic_version VALUES ('7aeb0c5eeb9a')")
+        conn.exec_driver_sql("INSERT INTO walk (lat, lon, distance, timestamp) "
+                             "VALUES (51.5, -0.1, 3, '2026-01-01 10:00:00')")
+    engine.dispose()
+
+    result = flask(path, 'db', 'upgrade')
+    assert result.returncode == 0, result.stderr
+    assert version(path) == HEAD
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT walks FROM walk_rollup").fetchall() == [(1,)]
+
+
+def test_init_db_refuses_existing_tables(tmp_path):
+    path = tmp_path / 'dog_walks.sqlite3'
+    assert flask(path, 'init-db').returncode == 0
+    assert version(path) == HEAD
+    assert flask(path, 'init-db').returncode != 0
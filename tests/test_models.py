@@ -1,19 +1,14 @@
 import pytest
 from app import app, db
-from models import Walk
+import json
+
+from models import Walk, decode_route, encode_route
 from datetime import datetime
 
 @pytest.fixture
 def test_app():
     app.config['TESTING'] = True
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'  # In-memory DB for testing
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-    
-    with app.app_context():
-        db.create_all()
-        yield app
-        db.session.remove()
-        db.drop_all()
+    return app
 
 def test_create_walk(test_app):
     with test_app.app_context():
@@ -101,4 +96,25 @@ def test_walk_model_duration(test_app):
         saved_walk = Walk.query.first()
         assert saved_walk.duration == 3600
         assert saved_walk.distance == 3.5
-        
+
+
+def test_route_stored_as_polyline(test_app):
+    route = [[37.7749, -122.4194], [37.7755, -122.4180], [37.7761, -122.4172]]
+    with test_app.app_context():
+        walk = Walk(lat=37.7749, lon=-122.4194, distance=1.0, route=encode_route(route))
+        db.session.add(walk)
+        db.session.commit()
+
+        saved_walk = db.session.get(Walk, walk.id)
+        assert not saved_walk.route.startswith('[')
+        assert len(saved_walk.route) < len(json.dumps(route))
+        assert saved_walk.route_coordinates == [tuple(point) for point in route]
+
+
+def test_route_accepts_legacy_json_and_strings():
+    route = [[51.5, -0.12], [51.501, -0.121]]
+    assert decode_route(json.dumps(route)) == route
+    assert decode_route(encode_route(json.dumps(route))) == [tuple(point) for point in route]
+    assert decode_route(encode_route({"coordinates": []})) == {"coordinates": []}
+    assert encode_route(None) is None
+    assert decode_route(None) is None
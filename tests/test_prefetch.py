@@ -0,0 +1,132 @@
+import threading
+import time
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app import app, db, prefetcher, weather_service
+from models import Walk
+from prefetch import Prefetcher, top_walk_locations
+
+
+class FakeService:
+    def __init__(self, fresh=(), fail=False):
+        self.fresh = set(fresh)
+        self.fail = fail
+        self.calls = []
+
+    def warm(self, lat, lon, margin):
+        if self.fail:
+            raise ConnectionError("upstream down")
+        if (lat, lon) in self.fresh:
+            return False
+        self.calls.append((lat, lon))
+        self.fresh.add((lat, lon))
+        return True
+
+
+def make_prefetcher(services, locations):
+    return Prefetcher(services, lambda: locations, interval=0.01, margin=60, max_rate=1000)
+
+
+def test_run_once_warms_every_service_and_skips_fresh_cells():
+    weather, spots = FakeService(), FakeService(fresh=[(1.0, 2.0)])
+    prefetcher = make_prefetcher([weather, spots], [(1.0, 2.0), (3.0, 4.0)])
+
+    assert prefetcher.run_once() == 3
+    assert weather.calls == [(1.0, 2.0), (3.0, 4.0)]
+    assert spots.calls == [(3.0, 4.0)]
+    assert prefetcher.run_once() == 0
+
+
+def test_run_once_counts_errors_and_carries_on():
+    working = FakeService()
+    prefetcher = make_prefetcher([FakeService(fail=True), working], [(1.0, 2.0)])
+
+    prefetcher.run_once()
+    assert working.calls == [(1.0, 2.0)]
+    assert prefetcher.stats()['errors'] == 1
+
+
+def test_background_thread_starts_and_stops():
+    service = FakeService()
+    prefetcher = make_prefetcher([service], [(1.0, 2.0)])
+
+    prefetcher.start()
+    assert prefetcher.stats()['running']
+    prefetcher.stop(timeout=5)
+    assert not prefetcher.stats()['running']
+    assert service.calls == [(1.0, 2.0)]
+
+
+def test_concurrent_starts_run_one_thread():
+    created = []
+
+    class SlowThread:
+        # Slow to create, widening the window between the check and the start
+        def __init__(self, **kwargs):
+            time.sleep(0.05)
+            created.append(self)
+            self.alive = False
+
+        def start(self):
+            self.alive = True
+
+        def is_alive(self):
+            return self.alive
+
+    prefetcher = make_prefetcher([FakeService()], [])
+    starters = [threading.Thread(target=prefetcher.start) for _ in range(8)]
+    with patch('prefetch.threading.Thread', SlowThread):
+        for starter in starters:
+            starter.start()
+        for starter in starters:
+            starter.join()
+
+    assert len(created) == 1
+
+
+@patch('app.upstream.get')
+def test_weather_warm_refreshes_only_near_expiry(mock_get):
+    mock_get.return_value = MagicMock(status_code=200)
+    mock_get.return_value.json.return_value = {
+        "main": {"temp": 18},
+        "weather": [{"main": "Clouds", "description": "few clouds", "icon": "02d"}]
+    }
+
+    assert weather_service.warm(37.7749, -122.4194, margin=60)
+    assert not weather_service.warm(37.7749, -122.4194, margin=60)
+    assert weather_service.warm(37.7749, -122.4194, margin=weather_service.cache.ttl)
+    assert mock_get.call_count == 2
+    assert weather_service.current(37.7749, -122.4194)['temperature'] == 18
+    assert mock_get.call_count == 2
+
+
+@pytest.fixture
+def hot_area():
+    with app.app_context():
+        db.session.add_all(Walk(lat=-45.0 + i * 0.001, lon=170.0, distance=2.0, timestamp=datetime.utcnow())
+                           for i in range(5))
+        db.session.commit()
+        yield
+
+
+def test_top_walk_locations_groups_recent_walks_by_area(hot_area):
+    locations = top_walk_locations(limit=100, days=1, precision=5)
+
+    hot = [(lat, lon) for lat, lon in locations if lat < -44]
+    assert len(hot) == 1
+    assert hot[0] == pytest.approx((-44.998, 170.0))
+
+
+def test_prefetcher_starts_on_first_request_not_import():
+    assert not prefetcher.running
+
+    app.config['PREFETCH_ENABLED'] = True
+    try:
+        with patch.object(prefetcher, 'start') as start:
+            app.test_client().get('/api/walks?per_page=1')
+        start.assert_called_once()
+    finally:
+        app.config['PREFETCH_ENABLED'] = False
@@ -0,0 +1,72 @@
+import os
+import pstats
+
+import pytest
+
+from app import app, profiler
+
+
+@pytest.fixture
+def client(tmp_path):
+    app.config['TESTING'] = True
+    saved = vars(profiler).copy()
+    profiler.enabled = True
+    profiler.directory = str(tmp_path)
+    profiler.token = 'secret'
+    profiler.sample_rate = 0.0
+    with app.test_client() as client:
+        yield client
+    vars(profiler).update(saved)
+
+
+def profiles():
+    return sorted(os.listdir(profiler.directory))
+
+
+def test_header_with_token_profiles_request(client):
+    response = client.get('/api/walks?per_page=5', headers={'X-Profile': 'secret'})
+
+    assert response.status_code == 200
+    [name] = profiles()
+    assert name.endswith('-api_walks.prof')
+    stats = pstats.Stats(os.path.join(profiler.directory, name))
+    assert any(func[2] == 'api_walks' for func in stats.stats)
+
+
+def test_requests_without_token_or_sampling_are_not_profiled(client):
+    client.get('/api/walks', headers={'X-Profile': 'wrong'})
+    client.get('/walks')
+    assert profiles() == []
+
+    profiler.sample_rate = 1.0
+    client.get('/walks')
+    assert len(profiles()) == 1
+
+
+def test_disabled_profiler_ignores_header(client):
+    profiler.enabled = False
+    client.get('/api/walks', headers={'X-Profile': 'secret'})
+    assert profiles() == []
+
+
+def test_rotation_keeps_directory_under_cap(client):
+    for i in range(5):
+        path = os.path.join(profiler.directory, f'old-{i}.prof')
+        with open(path, 'wb') as f:
+            f.write(b'x' * 1000)
+        os.utime(path, (i, i))
+    profiler.max_bytes = 2500
+
+    profiler.rotate()
+
+    assert profiles() == ['old-3.prof', 'old-4.prof']
+
+
+def test_failed_save_does_not_fail_request(client, monkeypatch):
+    def broken_save(profile, name):
+        raise OSError('disk full')
+    monkeypatch.setattr(profiler, 'save', broken_save)
+
+    response = client.get('/api/walks?per_page=5', headers={'X-Profile': 'secret'})
+
+    assert response.status_code == 200
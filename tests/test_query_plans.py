@@ -0,0 +1,80 @@
+from contextlib import contextmanager
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+
+from app import app, db, encode_cursor
+from models import Walk
+
+
+@contextmanager
+def captured_selects():
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT') and 'FROM walk' in statement:
+            statements.append((statement, parameters))
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', capture)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', capture)
+
+
+def query_plans(statements):
+    plans = []
+    with app.app_context():
+        with db.engine.connect() as conn:
+            for statement, parameters in statements:
+                rows = conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()
+                plans.append(' | '.join(row[-1] for row in rows))
+    return plans
+
+
+def listing_plan(client, url):
+    with captured_selects() as statements:
+        assert client.get(url).status_code == 200
+    listing = [s for s in statements if 'ORDER BY' in s[0]]
+    assert len(listing) == 1
+    return query_plans(listing)[0]
+
+
+@pytest.mark.parametrize('url', [
+    '/api/walks',
+    '/api/walks?page=3&per_page=5',
+    '/api/walks?cursor=',
+    '/walks',
+])
+def test_walk_listing_reads_timestamp_index_in_order(client, url):
+    plan = listing_plan(client, url)
+    assert 'ix_walk_timestamp_id' in plan
+    assert 'TEMP B-TREE' not in plan
+
+
+def test_date_filter_seeks_timestamp_index(client):
+    plan = listing_plan(client, '/api/walks?start_date=2024-01-01&end_date=2024-02-01')
+    assert 'SEARCH walk USING INDEX ix_walk_timestamp_id' in plan
+    assert 'TEMP B-TREE' not in plan
+
+
+def test_cursor_page_seeks_timestamp_index(client):
+    cursor = encode_cursor(Walk(id=42, timestamp=datetime(2024, 1, 1)))
+    plan = listing_plan(client, f'/api/walks?cursor={cursor}')
+    assert 'SEARCH walk USING INDEX ix_walk_timestamp_id' in plan
+    assert 'TEMP B-TREE' not in plan
+
+
+def test_distance_filter_uses_an_index(client):
+    plan = listing_plan(client, '/api/walks?min_distance=1&max_distance=3')
+    assert 'USING INDEX ix_walk_' in plan
+
+
+def test_nearby_walks_seek_geohash_index(client):
+    with captured_selects() as statements:
+        assert client.get('/api/walks/nearby?lat=37.7749&lon=-122.4194&radius_km=1').status_code == 200
+    plan = query_plans(statements)[0]
+    assert 'ix_walk_geohash' in plan
+    assert 'SCAN walk' not in plan
@@ -0,0 +1,109 @@
+import math
+
+import numpy as np
+
+from routing import (SpotIndex, create_route_coordinates, generate_loop_routes,
+                     generate_routes, score_routes)
+
+
+def path_length_km(route):
+    total = 0.0
+    for (lat1, lon1), (lat2, lon2) in zip(route[:-1], route[1:]):
+        d_lat = (lat2 - lat1) * 111
+        d_lon = (lon2 - lon1) * 111 * math.cos(math.radians(lat1))
+        total += math.hypot(d_lat, d_lon)
+    return total
+
+
+def test_generate_routes_shape_and_start():
+    routes = generate_routes(37.7749, -122.4194, [1.0, 2.0, 3.0], steps=20)
+    assert routes.shape == (3, 21, 2)
+    assert np.allclose(routes[:, 0], (37.7749, -122.4194))
+
+
+def test_generate_routes_matches_requested_distance():
+    distances = [0.9, 3.0, 7.5]
+    routes = generate_routes(51.5, -0.12, distances, steps=50)
+    for route, distance in zip(routes, distances):
+        assert abs(path_length_km(route.tolist()) - distance) < 1e-6
+
+
+def test_generate_routes_is_deterministic_for_a_seed():
+    first = generate_routes(40.0, -74.0, [2.0] * 10, rng=np.random.default_rng(7))
+    second = generate_routes(40.0, -74.0, [2.0] * 10, rng=np.random.default_rng(7))
+    assert np.array_equal(first, second)
+
+
+def test_generate_routes_limits_turns_between_segments():
+    routes = generate_routes(0.0, 0.0, [5.0] * 20, steps=30)
+    steps = np.diff(routes, axis=1)
+    bearings = np.degrees(np.arctan2(steps[..., 1], steps[..., 0]))
+    turns = (np.diff(bearings, axis=1) + 180) % 360 - 180
+    assert np.all(np.abs(turns) <= 45 + 1e-6)
+
+
+def test_create_route_coordinates_returns_tuples():
+    route = create_route_coordinates(37.7749, -122.4194, 3)
+    assert len(route) == 11
+    assert route[0] == (37.7749, -122.4194)
+    assert all(isinstance(point, tuple) and len(point) == 2 for point in route)
+
+
+def test_generate_loop_routes_close_on_start_and_match_distance():
+    distances = [0.5, 2.0, 10.0]
+    routes = generate_loop_routes(37.7749, -122.4194, distances, steps=40)
+    assert routes.shape == (3, 41, 2)
+    assert np.allclose(routes[:, 0], (37.7749, -122.4194))
+    assert np.allclose(routes[:, -1], (37.7749, -122.4194))
+    for route, distance in zip(routes, distances):
+        assert abs(path_length_km(route.tolist()) - distance) < 0.01 * distance
+
+
+def test_generate_loop_routes_stay_near_start():
+    routes = generate_loop_routes(48.85, 2.35, [4.0] * 50, steps=20)
+    offsets_km = np.abs(routes - (48.85, 2.35)) * 111
+    # A loop never gets further from its start than half its length
+    assert np.all(offsets_km.max(axis=1) <= 2.0 * 1.5)
+
+
+def test_spot_index_matches_brute_force():
+    rng = np.random.default_rng(3)
+    spots = [{'lat': lat, 'lon': lon, 'type': 'dog_park'}
+             for lat, lon in zip(rng.uniform(37.76, 37.79, 300), rng.uniform(-122.43, -122.40, 300))]
+    points = np.column_stack([rng.uniform(37.76, 37.79, 500), rng.uniform(-122.43, -122.40, 500)])
+
+    index = SpotIndex(spots, 37.7749, cell_km=0.2)
+    point_idx, spot_idx = index.pairs_within(points, 0.2)
+    found = set(zip(point_idx.tolist(), spot_idx.tolist()))
+
+    expected = set()
+    for p, (lat, lon) in enumerate(points):
+        for s, spot in enumerate(spots):
+            d_lat = (spot['lat'] - lat) * 111
+            d_lon = (spot['lon'] - lon) * 111 * math.cos(math.radians(37.7749))
+            if math.hypot(d_lat, d_lon) <= 0.2:
+                expected.add((p, s))
+    assert found == expected
+
+
+def test_score_routes_counts_each_spot_once_per_route():
+    routes = np.array([
+        [[0.0, 0.0], [0.0, 0.0005], [0.0, 0.001]],
+        [[0.0, 0.0], [0.01, 0.0], [0.02, 0.0]],
+    ])
+    spots = [
+        {'lat': 0.0, 'lon': 0.001, 'type': 'dog_park'},
+        {'lat': 0.02, 'lon': 0.0, 'type': 'drinking_water'},
+        {'lat': 0.0, 'lon': 0.0, 'type': 'shop_we_ignore'},
+    ]
+    scores, passed = score_routes(routes, spots, {'dog_park': 3, 'drinking_water': 2}, 0.1)
+
+    assert scores.tolist() == [3.0, 2.0]
+    assert passed == [[0, 2], [1, 2]]
+
+
+def test_score_routes_without_spots():
+    routes = generate_routes(0.0, 0.0, [1.0, 1.0])
+    scores, passed = score_routes(routes, [], {'dog_park': 3}, 0.1)
+    assert scores.tolist() == [0.0, 0.0]
+    assert passed == [[], []]
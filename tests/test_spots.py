@@ -0,0 +1,135 @@
+import json
+import tracemalloc
+from unittest.mock import MagicMock
+
+import pytest
+
+from app import app, get_dog_friendly_spots, spot_service
+from models import Spot
+from spots import SpotRecord, SpotService, parse_osm_xml
+
+OSM_XML = """<?xml version='1.0' encoding='UTF-8'?>
+<osm version="0.6">
+  <node id="1" lat="37.7750" lon="-122.4195">
+    <tag k="leisure" v="dog_park"/>
+    <tag k="name" v="Duboce Dog Park"/>
+  </node>
+  <node id="2" lat="37.7760" lon="-122.4180">
+    <tag k="amenity" v="waste_basket"/>
+    <tag k="waste" v="dog_waste_bin"/>
+  </node>
+  <node id="3" lat="37.7755" lon="-122.4190">
+    <tag k="highway" v="crossing"/>
+  </node>
+  <node id="4" lat="37.9000" lon="-122.4190">
+    <tag k="amenity" v="drinking_water"/>
+  </node>
+  <way id="10">
+    <nd ref="1"/>
+    <tag k="leisure" v="dog_park"/>
+  </way>
+</osm>
+"""
+
+
+@pytest.fixture
+def local_client():
+    app.config['TESTING'] = True
+    spot_service.source = 'local'
+    with app.test_client() as client:
+        yield client
+    spot_service.source = 'overpass'
+
+
+def import_file(path, *args):
+    result = app.test_cli_runner().invoke(args=['import-spots', str(path), *args])
+    assert result.exit_code == 0, result.output
+    return result.output
+
+
+def test_import_osm_xml_and_query_locally(local_client, tmp_path):
+    path = tmp_path / 'area.osm'
+    path.write_text(OSM_XML)
+    assert 'Imported 4 spots' in import_file(path)
+
+    response = local_client.post('/dog-spots', json={'lat': 37.7749, 'lon': -122.4194})
+    spots = response.get_json()['spots']
+    assert [(s['name'], s['type']) for s in spots] == [
+        ('Duboce Dog Park', 'dog_park'), ('Unnamed', 'waste_basket')]
+
+    route_spots = get_dog_friendly_spots(37.7749, -122.4194, radius=1500)
+    assert len(route_spots) == 2
+
+
+def test_parse_osm_xml_memory_stays_flat(tmp_path):
+    path = tmp_path / 'big.osm'
+    path.write_text("<osm>" + '<node id="1" lat="1.0" lon="2.0"/>' * 50000 + "</osm>")
+    tracemalloc.start()
+    try:
+        assert list(parse_osm_xml(str(path))) == []
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    # Keeping every cleared node under the root costs about 4 MB here
+    assert peak < 1024 * 1024
+
+
+def test_import_overpass_json_with_bbox_and_reimport(local_client, tmp_path):
+    path = tmp_path / 'area.json'
+    path.write_text(json.dumps({'elements': [
+        {'type': 'node', 'id': 5, 'lat': 51.5, 'lon': -0.12,
+         'tags': {'amenity': 'drinking_water', 'name': 'Fountain'}},
+        {'type': 'way', 'id': 6, 'center': {'lat': 51.501, 'lon': -0.121},
+         'tags': {'leisure': 'dog_park', 'name': 'Green Park'}},
+        {'type': 'node', 'id': 7, 'lat': 48.85, 'lon': 2.35, 'tags': {'shop': 'pet'}},
+    ]}))
+    assert 'Imported 2 spots' in import_file(path, '--bbox', '51,-1,52,0')
+    assert 'Imported 2 spots' in import_file(path, '--bbox', '51,-1,52,0')
+
+    with app.app_context():
+        assert Spot.query.count() == 2
+    spots = local_client.post('/dog-spots', json={'lat': 51.5, 'lon': -0.12}).get_json()['spots']
+    assert {s['name'] for s in spots} == {'Fountain', 'Green Park'}
+
+
+def test_import_rejects_bad_bbox(local_client, tmp_path):
+    path = tmp_path / 'area.osm'
+    path.write_text(OSM_XML)
+    result = app.test_cli_runner().invoke(args=['import-spots', str(path), '--bbox', '1,2'])
+    assert result.exit_code != 0
+
+
+def make_overpass_service(elements):
+    http = MagicMock()
+    http.post.return_value.json.return_value = {'elements': elements}
+    service = SpotService(http, source='overpass', fetch_radius_m=2000, ttl=60,
+                          maxsize=10, cell_degrees=0.005)
+    return service, http
+
+
+def test_spot_service_serves_smaller_radii_and_categories_from_one_fetch():
+    service, http = make_overpass_service([
+        {'id': 1, 'lat': 37.7750, 'lon': -122.4195, 'tags': {'leisure': 'dog_park'}},
+        {'id': 2, 'lat': 37.7880, 'lon': -122.4194, 'tags': {'amenity': 'drinking_water'}},
+        {'id': 3, 'lat': 37.7752, 'lon': -122.4190,
+         'tags': {'amenity': 'waste_basket', 'waste': 'dog_waste_bin'}},
+    ])
+
+    wide = service.nearby(37.7749, -122.4194, 2000, ['dog_park', 'drinking_water', 'dog_waste_bin'])
+    narrow = service.nearby(37.7749, -122.4194, 1000, ['dog_park', 'waste_basket'])
+
+    assert http.post.call_count == 1
+    assert [s.osm_id for s in wide] == [1, 2, 3]
+    assert [(s.osm_id, s.type) for s in narrow] == [(1, 'dog_park'), (3, 'waste_basket')]
+    assert isinstance(wide[0], SpotRecord)
+    assert wide[0].as_json() == {'lat': 37.775, 'lon': -122.4195, 'type': 'dog_park', 'name': 'Unnamed'}
+
+    query = http.post.call_args.kwargs['data']['data']
+    assert 'node["waste"="dog_waste_bin"]' in query
+    assert 'around:2393' in query
+
+
+def test_spot_service_rejects_radius_beyond_fetch_radius():
+    service, _ = make_overpass_service([])
+    with pytest.raises(ValueError):
+        service.nearby(37.7749, -122.4194, 5000, ['dog_park'])
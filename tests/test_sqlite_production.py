@@ -0,0 +1,93 @@
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from config import Config, ProductionConfig
+from models import Walk, use_sqlite_pragmas
+
+
+def make_engine(path, config, **overrides):
+    options = dict(getattr(config, 'SQLALCHEMY_ENGINE_OPTIONS', {}), **overrides)
+    engine = create_engine(f"sqlite:///{path}", **options)
+    use_sqlite_pragmas(engine, config.SQLITE_PRAGMAS)
+    Walk.__table__.create(engine)
+    with engine.begin() as conn:
+        conn.execute(Walk.__table__.insert(), [{'lat': 1.0, 'lon': 2.0, 'distance': 3.0}] * 10)
+    return engine
+
+
+def hold_write_lock(engine, locked, release):
+    # A writer mid-transaction holding the strongest lock SQLite has
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("BEGIN EXCLUSIVE")
+        cursor.execute("INSERT INTO walk (lat, lon, distance) VALUES (1, 2, 3)")
+        locked.set()
+        release.wait(timeout=10)
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def count_walks(engine):
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT count(*) FROM walk")).scalar()
+
+
+def test_production_pragmas_are_applied(tmp_path):
+    engine = make_engine(tmp_path / 'walks.sqlite3', ProductionConfig)
+
+    with engine.connect() as conn:
+        pragma = lambda name: conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+        assert pragma('journal_mode') == 'wal'
+        assert pragma('synchronous') == 1
+        assert pragma('busy_timeout') == 5000
+        assert pragma('cache_size') == -65536
+        assert pragma('mmap_size') == 256 * 1024 * 1024
+    assert engine.pool.size() == ProductionConfig.SQLALCHEMY_ENGINE_OPTIONS['pool_size']
+
+
+def test_readers_do_not_block_behind_writer_in_production_mode(tmp_path):
+    engine = make_engine(tmp_path / 'walks.sqlite3', ProductionConfig)
+    locked, release = threading.Event(), threading.Event()
+    writer = threading.Thread(target=hold_write_lock, args=(engine, locked, release))
+    writer.start()
+    assert locked.wait(timeout=5)
+
+    results = []
+    readers = [threading.Thread(target=lambda: results.append((count_walks(engine), time.perf_counter())))
+               for _ in range(4)]
+    started = time.perf_counter()
+    for reader in readers:
+        reader.start()
+    for reader in readers:
+        reader.join(timeout=5)
+
+    # Every reader finished, seeing the last committed state, while the
+    # writer still held its transaction open
+    assert writer.is_alive()
+    assert [count for count, _ in results] == [10] * 4
+    assert max(finished for _, finished in results) - started < 1.0
+
+    release.set()
+    writer.join(timeout=5)
+    assert count_walks(engine) == 11
+
+
+def test_default_journal_blocks_readers_behind_writer(tmp_path):
+    engine = make_engine(tmp_path / 'walks.sqlite3', Config, connect_args={'timeout': 0.2})
+    locked, release = threading.Event(), threading.Event()
+    writer = threading.Thread(target=hold_write_lock, args=(engine, locked, release))
+    writer.start()
+    assert locked.wait(timeout=5)
+
+    try:
+        with pytest.raises(OperationalError, match='database is locked'):
+            count_walks(engine)
+    finally:
+        release.set()
+        writer.join(timeout=5)
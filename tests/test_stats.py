@@ -0,0 +1,57 @@
+import pytest
+
+from app import app
+from stats import rebuild_rollups
+
+
+WALKS = [
+    {'lat': 37.77, 'lon': -122.41, 'distance': 1.5, 'duration': 1200, 'difficulty': 'easy',
+     'condition': 'Clear', 'timestamp': '2019-04-01T08:00:00'},
+    {'lat': 37.77, 'lon': -122.41, 'distance': 3.0, 'duration': 2400, 'difficulty': 'medium',
+     'condition': 'Rain', 'timestamp': '2019-04-01T18:00:00'},
+    {'lat': 37.77, 'lon': -122.41, 'distance': 4.5, 'duration': 3600, 'difficulty': 'hard',
+     'condition': 'Clear', 'timestamp': '2019-04-20T09:00:00'},
+]
+
+
+def get_stats(client, period):
+    response = client.get(f'/api/walks/stats?period={period}&start_date=2019-01-01&end_date=2019-12-31')
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_stats_follow_saved_walks(client):
+    assert client.post('/api/walks/bulk', json=WALKS).status_code == 201
+
+    daily = get_stats(client, 'day')
+    assert daily['totals']['walks'] == 3
+    assert daily['totals']['avg_distance'] == pytest.approx(3.0)
+    assert [(b['period'], b['walks']) for b in daily['buckets']] == [('2019-04-01', 2), ('2019-04-20', 1)]
+    assert daily['distributions']['condition'] == {'Clear': 2, 'Rain': 1}
+    assert daily['distributions']['distance_km'] == {'1': 1, '3': 1, '4': 1}
+    assert daily['distributions']['duration_15min'] == {'1': 1, '2': 1, '4': 1}
+
+    monthly = get_stats(client, 'month')
+    assert [(b['period'], b['total_distance']) for b in monthly['buckets']] == [('2019-04', 9.0)]
+
+
+def test_weeks_spanning_new_year_are_one_bucket(client):
+    walks = [dict(WALKS[0], timestamp=timestamp)
+             for timestamp in ('2018-12-30T08:00:00', '2018-12-31T08:00:00', '2019-01-02T08:00:00')]
+    client.post('/api/walks/bulk', json=walks)
+    response = client.get('/api/walks/stats?period=week&start_date=2018-12-01&end_date=2019-01-31')
+    buckets = response.get_json()['buckets']
+    # Weeks are labelled by their Monday
+    assert [(b['period'], b['walks']) for b in buckets] == [('2018-12-24', 1), ('2018-12-31', 2)]
+
+
+def test_rebuild_matches_incremental_rollups(client):
+    client.post('/api/walks/bulk', json=WALKS)
+    incremental = get_stats(client, 'week')
+    with app.app_context():
+        rebuild_rollups()
+    assert get_stats(client, 'week') == incremental
+
+
+def test_stats_rejects_unknown_period(client):
+    assert client.get('/api/walks/stats?period=decade').status_code == 400
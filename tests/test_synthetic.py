@@ -0,0 +1,93 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+from app import app, db
+from geo import encode_geohash, encode_geohashes
+from models import Walk, WalkRollup, decode_route, encode_route, encode_routes
+from routing import MAX_ROUTE_KM, MIN_ROUTE_KM, generate_routes, route_difficulty
+from synthetic import synthetic_walks
+
+
+def test_encode_geohashes_matches_scalar_encoder():
+    rng = np.random.default_rng(3)
+    lats, lons = rng.uniform(-89.9, 89.9, 500), rng.uniform(-179.9, 179.9, 500)
+
+    assert encode_geohashes(lats, lons, 9) == [encode_geohash(lat, lon, 9) for lat, lon in zip(lats, lons)]
+
+
+def test_encode_routes_matches_encode_route():
+    rng = np.random.default_rng(3)
+    routes = generate_routes(rng.uniform(-60, 60, 200), rng.uniform(-170, 170, 200),
+                             rng.uniform(0.5, 12, 200), steps=12, rng=rng)
+
+    encoded = encode_routes(routes)
+    assert encoded == [encode_route(route.tolist()) for route in routes]
+    assert np.allclose(decode_route(encoded[0]), routes[0], atol=1e-5)
+
+
+def test_generate_routes_accepts_one_origin_per_route():
+    routes = generate_routes([10.0, -20.0], [30.0, 40.0], [2.0, 3.0], steps=4)
+
+    assert routes[:, 0].tolist() == [[10.0, 30.0], [-20.0, 40.0]]
+
+
+def test_synthetic_walks_are_deterministic_and_stay_in_range():
+    areas = [(37.77, -122.42, 2.0), (51.5, -0.12, 1.0)]
+    first = synthetic_walks(1000, areas, date(2023, 3, 1), date(2023, 4, 1), np.random.default_rng(5))
+    second = synthetic_walks(1000, areas, date(2023, 3, 1), date(2023, 4, 1), np.random.default_rng(5))
+
+    for key in first:
+        assert np.array_equal(first[key], second[key])
+    assert first['timestamp'].min() >= np.datetime64('2023-03-01')
+    assert first['timestamp'].max() < np.datetime64('2023-04-01')
+    near_sf = np.abs(first['lat'] - 37.77) < 0.02
+    near_london = np.abs(first['lat'] - 51.5) < 0.01
+    assert np.all(near_sf | near_london)
+    assert near_sf.any() and near_london.any()
+    assert first['distance'].min() >= MIN_ROUTE_KM and first['distance'].max() <= MAX_ROUTE_KM
+    assert first['difficulty'].tolist() == [route_difficulty(d) for d in first['distance']]
+
+
+def test_route_difficulty_matches_for_scalars_and_arrays():
+    distances = [0.5, 2.0, 2.01, 4.0, 4.5, 10.0]
+    expected = ['easy', 'easy', 'medium', 'medium', 'hard', 'hard']
+
+    assert route_difficulty(np.array(distances)).tolist() == expected
+    assert [route_difficulty(d) for d in distances] == expected
+
+
+@pytest.fixture
+def runner():
+    return app.test_cli_runner()
+
+
+def test_generate_walks_command_inserts_queryable_walks(runner):
+    result = runner.invoke(args=['generate-walks', '250', '--area', '-60,10,1', '--batch-size', '100',
+                                 '--start', '2018-01-01', '--end', '2018-02-01', '--seed', '2'])
+    assert result.exit_code == 0, result.output
+
+    with app.app_context():
+        walks = Walk.query.filter(Walk.lat < -59).all()
+        assert len(walks) == 250
+        walk = walks[0]
+        assert walk.geohash == encode_geohash(walk.lat, walk.lon, 9)
+        assert walk.route_coordinates[0] == pytest.approx((walk.lat, walk.lon), abs=1e-5)
+        assert date(2018, 1, 1) <= walk.timestamp.date() < date(2018, 2, 1)
+        rolled_up = db.session.query(db.func.sum(WalkRollup.walks)).filter(
+            WalkRollup.day < date(2018, 2, 1), WalkRollup.day >= date(2018, 1, 1)).scalar()
+        assert rolled_up >= 250
+
+
+def test_generate_walks_command_rejects_bad_area(runner):
+    result = runner.invoke(args=['generate-walks', '10', '--area', '1,2'])
+    assert result.exit_code != 0
+    assert 'lat,lon,radius_km' in result.output
+
+
+@pytest.mark.parametrize('option', [['--batch-size', '0'], ['--batch-size', '-5'], ['--route-points', '1']])
+def test_generate_walks_command_rejects_bad_sizes(runner, option):
+    result = runner.invoke(args=['generate-walks', '10', *option])
+    assert result.exit_code == 2
+    assert 'Invalid value' in result.output
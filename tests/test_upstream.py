@@ -0,0 +1,74 @@
+from unittest.mock import patch, MagicMock
+
+import pytest
+
+from upstream import CircuitBreaker, CircuitOpenError, UpstreamClient
+
+
+def make_client():
+    return UpstreamClient(connect_timeout=1, read_timeout=5, retries=3,
+                          backoff_factor=0.1, pool_size=4)
+
+
+def test_requests_use_default_timeout():
+    client = make_client()
+    with patch.object(client.session, 'request', return_value=MagicMock()) as mock_request:
+        client.get('https://example.com/weather')
+        client.post('https://example.com/interpreter', data={'data': 'q'}, timeout=2)
+
+    assert mock_request.call_args_list[0].kwargs['timeout'] == (1, 5)
+    assert mock_request.call_args_list[1].kwargs['timeout'] == 2
+
+
+def test_session_adapters_pool_and_retry():
+    client = make_client()
+    adapter = client.session.get_adapter('https://api.openweathermap.org/')
+    assert adapter is client.session.get_adapter('http://overpass-api.de/')
+    assert adapter._pool_maxsize == 4
+    assert adapter.max_retries.total == 3
+    assert 503 in adapter.max_retries.status_forcelist
+    assert 'POST' in adapter.max_retries.allowed_methods
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def fail():
+    raise ConnectionError("upstream down")
+
+
+def test_circuit_breaker_opens_after_consecutive_failures():
+    clock = FakeClock()
+    breaker = CircuitBreaker('weather', failure_threshold=2, reset_timeout=30, clock=clock)
+
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            breaker.call(fail)
+    assert breaker.state == 'open'
+
+    calls = []
+    with pytest.raises(CircuitOpenError):
+        breaker.call(calls.append, 1)
+    assert calls == []
+    assert breaker.status()['rejected_calls'] == 1
+
+
+def test_circuit_breaker_half_open_trial_closes_or_reopens():
+    clock = FakeClock()
+    breaker = CircuitBreaker('overpass', failure_threshold=1, reset_timeout=30, clock=clock)
+    with pytest.raises(ConnectionError):
+        breaker.call(fail)
+
+    clock.now = 31
+    with pytest.raises(ConnectionError):
+        breaker.call(fail)
+    assert breaker.state == 'open'
+
+    clock.now = 62
+    assert breaker.call(lambda: 'ok') == 'ok'
+    assert breaker.status() == {"state": "closed", "consecutive_failures": 0, "rejected_calls": 0}
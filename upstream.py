@@ -0,0 +1,134 @@
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class UpstreamClient:
+    """Shared HTTP client for OpenWeather, Overpass and other upstream APIs.
+
+    Requests go through one pooled keep-alive session, always carry a
+    (connect, read) timeout and are retried with exponential backoff on
+    connection errors and retryable status codes. If observer is set it is
+    called with (method, url, status, seconds) after every request; status
+    is 'error' when no response came back.
+    """
+
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, connect_timeout, read_timeout, retries, backoff_factor, pool_size):
+        self.timeout = (connect_timeout, read_timeout)
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=self.RETRY_STATUSES,
+            # Overpass queries are POSTed but are read-only, so safe to retry
+            allowed_methods=frozenset(['GET', 'POST']),
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                              max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.observer = None
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(connect_timeout=config['UPSTREAM_CONNECT_TIMEOUT'],
+                   read_timeout=config['UPSTREAM_READ_TIMEOUT'],
+                   retries=config['UPSTREAM_RETRIES'],
+                   backoff_factor=config['UPSTREAM_BACKOFF_FACTOR'],
+                   pool_size=config['UPSTREAM_POOL_SIZE'])
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        if self.observer is None:
+            return self.session.request(method, url, **kwargs)
+        started = time.perf_counter()
+        status = 'error'
+        try:
+            response = self.session.request(method, url, **kwargs)
+            status = response.status_code
+            return response
+        finally:
+            self.observer(method, url, status, time.perf_counter() - started)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """Fail fast once an upstream keeps erroring.
+
+    After failure_threshold consecutive failures the breaker opens and
+    rejects calls with CircuitOpenError. Once reset_timeout has passed, a
+    single trial call is let through ("half open"). If it succeeds the
+    breaker closes; if it fails the breaker opens again.
+    """
+
+    def __init__(self, name, failure_threshold, reset_timeout, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self.opened_at = None
+            self.rejected = 0
+            self._trial_running = False
+
+    def call(self, fn, *args, **kwargs):
+        with self._lock:
+            if self.state == 'open' and self.clock() - self.opened_at >= self.reset_timeout:
+                self.state = 'half_open'
+            if self.state == 'open' or (self.state == 'half_open' and self._trial_running):
+                self.rejected += 1
+                raise CircuitOpenError(f"{self.name} circuit is open")
+            if self.state == 'half_open':
+                self._trial_running = True
+
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            with self._lock:
+                self._trial_running = False
+                self.failures += 1
+                if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                    self.state = 'open'
+                    self.opened_at = self.clock()
+            raise
+
+        with self._lock:
+            self._trial_running = False
+            self.state = 'closed'
+            self.failures = 0
+        return result
+
+    def status(self):
+        with self._lock:
+            status = {
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "rejected_calls": self.rejected
+            }
+            if self.state != 'closed':
+                status["retry_in_seconds"] = max(0.0, self.reset_timeout - (self.clock() - self.opened_at))
+            return status
@@ -0,0 +1,60 @@
+from cache import SingleFlight, TTLCache, cell_center, grid_cell, stale_while_revalidate
+
+OPENWEATHER_URL = "https://api.openweathermap.org/data/2.5/weather"
+
+
+class WeatherService:
+    """Current-weather lookups cached per coarse location bucket.
+
+    OpenWeather data only changes every few minutes and kilometres, so all
+    requests falling in the same grid cell within one TTL window share a
+    single upstream call made for the center of that cell. Expired readings
+    are served for up to stale_ttl seconds while executor refreshes them.
+    """
+
+    def __init__(self, http, api_key, ttl, maxsize, cell_degrees, breaker=None, stale_ttl=0, executor=None,
+                 url=OPENWEATHER_URL):
+        self.http = http
+        self.api_key = api_key
+        self.url = url
+        self.cell_degrees = cell_degrees
+        self.breaker = breaker
+        self.executor = executor
+        self.cache = TTLCache(ttl=ttl, maxsize=maxsize, stale_ttl=stale_ttl)
+        self.flight = SingleFlight()
+
+    def current(self, lat, lon):
+        cell = grid_cell(lat, lon, self.cell_degrees)
+        return stale_while_revalidate(self.cache, self.flight, cell, self.refresh, self.executor)
+
+    def warm(self, lat, lon, margin):
+        """Refresh the cell around (lat, lon) unless it stays fresh for margin seconds.
+
+        Returns True when an upstream call was made.
+        """
+        cell = grid_cell(lat, lon, self.cell_degrees)
+        if self.cache.fresh_for(cell) > margin:
+            return False
+        self.flight.do(cell, self.refresh, cell)
+        return True
+
+    def refresh(self, cell):
+        lat, lon = cell_center(cell, self.cell_degrees)
+        if self.breaker is None:
+            weather = self.fetch(lat, lon)
+        else:
+            weather = self.breaker.call(self.fetch, lat, lon)
+        self.cache.set(cell, weather)
+        return weather
+
+    def fetch(self, lat, lon):
+        url = f"{self.url}?lat={lat}&lon={lon}&appid={self.api_key}&units=metric"
+        response = self.http.get(url)
+        response.raise_for_status()
+        weather = response.json()
+        return {
+            "temperature": weather['main']['temp'],
+            "condition": weather['weather'][0]['main'],
+            "description": weather['weather'][0]['description'],
+            "icon": weather['weather'][0].get('icon')
+        }